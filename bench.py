@@ -0,0 +1,231 @@
+import argparse, platform, random, types, json, time, sys, os
+
+import arcade, numpy as np, pymunk
+
+from utils.utils import summarize_timings
+
+WIDTH, HEIGHT = 1920, 1080
+
+class HeadlessMouse(dict):
+    @property
+    def data(self):
+        return self
+
+class HeadlessWindow():
+    def __init__(self, width, height):
+        self.width, self.height = width, height
+        self.mouse = HeadlessMouse({arcade.MOUSE_BUTTON_LEFT: False, "x": 0, "y": 0})
+        self.keyboard = {}
+        self._draw_rate = 1 / 60
+
+def create_game(game_class, game_key, settings):
+    # BaseGame.__init__ builds UI and needs a real window, so only the state used by the update logic is set up here
+    game = game_class.__new__(game_class)
+    game.window = HeadlessWindow(WIDTH, HEIGHT)
+    game.game_key = game_key
+    game.settings = {game_key: settings}
+
+    return game
+
+def boid_simulator():
+    from game.boid_simulator.game import Game
+    from game.boid_simulator.flock import Flock
+
+    game = create_game(Game, "boid_simulator", {"w_separation": 1.0, "w_alignment": 1.0, "w_cohesion": 1.0, "small_radius": 100, "large_radius": 250, "parallel_workers": 0})
+
+    game.flock = Flock()
+    game.parallel_flock = None
+    game.parallel_workers_changed = None
+
+    for _ in range(1000):
+        game.create_boid(random.uniform(0, WIDTH * 0.8), random.uniform(0, HEIGHT))
+
+    return lambda: game.on_update(1 / 60)
+
+def double_pendulum_simulator():
+    from game.double_pendulum_simulator.game import Game
+    import math
+
+    game = create_game(Game, "double_pendulum_simulator", {"length_a": 200, "length_b": 200, "mass_a": 40, "mass_b": 40, "gravity": 9.81, "speed": 100, "trail_size": 500})
+
+    game.theta_a, game.theta_b = math.pi / 2, math.pi / 2
+    game.omega_a, game.omega_b = 0, 0
+    game.origin_x, game.origin_y = WIDTH * 0.4, HEIGHT / 2
+    game.trace = []
+
+    return lambda: game.on_update(1 / 60)
+
+def spirograph_simulator():
+    from game.spirograph_simulator.game import Game
+
+    game = create_game(Game, "spirograph_simulator", {"big_radius": 220, "small_radius": 65, "pen_distance": 100, "step_size": 0.01, "trail_size": 2000, "mode": "inside"})
+
+    game.center_points = [[WIDTH * 0.4, HEIGHT / 2, 0, []] for _ in range(10)]
+    game.running = True
+
+    return lambda: game.on_update(1 / 60)
+
+def fourier_simulator():
+    from game.fourier_simulator.game import Game
+
+    game = create_game(Game, "fourier_simulator", {"max_coefficients": 1000, "speed": 1.0, "tail_size": 1000, "resampling_size": 512, "truncation": "First", "energy_fraction": 99.9})
+
+    t = np.linspace(0, 2 * np.pi, 2000)
+    game.path_points = list((0.4 + 0.2 * np.cos(t) * (1 + 0.3 * np.cos(5 * t))) + 1j * (0.5 + 0.2 * np.sin(t) * (1 + 0.3 * np.cos(5 * t))))
+    game.drawing_trail = []
+    game.drawing_done = True
+    game.time = 0.0
+    game.fidelity_label = types.SimpleNamespace(text="")
+
+    game.calculate_fourier_coefficients()
+
+    return lambda: game.on_update(1 / 60)
+
+def delaunay_points():
+    from game.point_sets import generate_points
+
+    corners = [(0, 0), (0, HEIGHT), (WIDTH * 0.8, 0), (WIDTH * 0.8, HEIGHT)]
+
+    return np.vstack([corners, generate_points("Poisson disc", 20000, WIDTH * 0.8, HEIGHT)]), len(corners)
+
+def delaunay_rebuild():
+    from game.delaunay_simulator.triangulation import IncrementalDelaunay
+
+    # the full triangulation the worker thread builds after a change the local updates can not handle
+    points, _ = delaunay_points()
+
+    return lambda: IncrementalDelaunay(points)
+
+def delaunay_drag():
+    from game.delaunay_simulator.triangulation import IncrementalDelaunay
+
+    # a drag of one point through a big triangulation, the renderer needs a GL context.
+    # interior points moved inside of the hull always stay local, a fallback would be a rebuild on the worker and not part of a frame
+    points, corner_count = delaunay_points()
+    triangulation = IncrementalDelaunay(points)
+
+    def tick():
+        vertex = random.randrange(corner_count, len(triangulation.positions()))
+        x, y = triangulation.positions()[vertex]
+
+        if not triangulation.move(vertex, (min(max(x + random.uniform(-5, 5), 1), WIDTH * 0.8 - 1), min(max(y + random.uniform(-5, 5), 1), HEIGHT - 1))):
+            raise RuntimeError("a drag fell back to a full rebuild")
+
+    return tick
+
+def voronoi_diagram_simulator():
+    from game.voronoi_diagram_simulator.rasteriser import rasterise
+    from game.point_sets import generate_points
+    from game.site_index import SiteIndex
+
+    # the CPU rasteriser at a quarter of the resolution in each direction, the live diagram runs on the GPU
+    site_index = SiteIndex(generate_points("Uniform", 2000, WIDTH * 0.8, HEIGHT))
+
+    return lambda: rasterise(site_index, int(WIDTH * 0.8), HEIGHT, 0.01, 0.005, scale=0.25)
+
+def water_simulator():
+    from game.water_simulator.solver import WaterSolver
+
+    # the NumPy backend, the GPU one needs a GL context
+    solver = WaterSolver(np.random.uniform(-0.1, 0.1, (512, 512)))
+
+    def tick():
+        for row, col in np.random.randint(1, 511, (20, 2)):
+            solver.add_splash(row, col, 0.1, 3)
+
+        solver.step(1, 0.02)
+
+    return tick
+
+def lorenz_attractor_simulator():
+    from game.lorenz_attractor_simulator.sweep import LorenzIntegrator
+
+    # the NumPy integrator of the offline sweep, the live view runs on the GPU
+    integrator = LorenzIntegrator(10, 28, 2.66666666, int(WIDTH * 0.8), HEIGHT, 65536)
+
+    return lambda: integrator.step(0.005, 10)
+
+def physics_playground():
+    from game.physics_playground.game import Game
+
+    game = create_game(Game, "physics_playground", {})
+
+    game.space = pymunk.Space()
+    game.space.iterations = 50
+    game.space.gravity = (0, -930)
+
+    game.spritelist = arcade.SpriteList()
+    game.walls = []
+    game.crate_elasticity, game.crate_friction = 0.5, 0.9
+    game.coin_elasticity, game.coin_friction = 0.5, 0.9
+
+    game.create_wall(WIDTH * 0.8, 80, 0, 0)
+
+    for i in range(500):
+        if i % 2:
+            game.create_crate(random.uniform(50, WIDTH * 0.75), random.uniform(100, HEIGHT), 32, 1)
+        else:
+            game.create_coin(random.uniform(50, WIDTH * 0.75), random.uniform(100, HEIGHT), 10, 1)
+
+    return lambda: game.space.step(1 / 60)
+
+benchmarks = {
+    "boid_simulator": boid_simulator,
+    "double_pendulum_simulator": double_pendulum_simulator,
+    "spirograph_simulator": spirograph_simulator,
+    "fourier_simulator": fourier_simulator,
+    "delaunay_rebuild": delaunay_rebuild,
+    "delaunay_drag": delaunay_drag,
+    "voronoi_diagram_simulator": voronoi_diagram_simulator,
+    "water_simulator": water_simulator,
+    "lorenz_attractor_simulator": lorenz_attractor_simulator,
+    "physics_playground": physics_playground
+}
+
+def run_benchmark(name, ticks, warmup):
+    random.seed(0)
+    np.random.seed(0)
+
+    tick = benchmarks[name]()
+
+    for _ in range(warmup):
+        tick()
+
+    timings = []
+    for _ in range(ticks):
+        start = time.perf_counter()
+        tick()
+        timings.append(time.perf_counter() - start)
+
+    return summarize_timings(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the simulators' update logic headlessly and reports tick times as JSON.")
+    parser.add_argument("--ticks", type=int, default=300, help="measured ticks per simulator")
+    parser.add_argument("--warmup", type=int, default=30, help="unmeasured ticks before measuring")
+    parser.add_argument("--only", nargs="+", choices=list(benchmarks), help="only run these simulators")
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args()
+
+    report = {
+        "machine": {
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__
+        },
+        "ticks": args.ticks,
+        "warmup": args.warmup,
+        "results": {name: run_benchmark(name, args.ticks, args.warmup) for name in (args.only or benchmarks)}
+    }
+
+    report_json = json.dumps(report, indent=4)
+    print(report_json)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(report_json)
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,11 @@
-import arcade, arcade.gui, os, json
+import arcade, arcade.gui, logging, types, os, json
+
+from utils.constants import log_dir, button_style
+from utils.preload import button_texture, button_hovered_texture
+
+from game.profiler import FrameProfiler, ProfilerOverlay
+from game.gpu_timer import GPUTimer
+from game.point_sets import GENERATORS, generate_points, load_points, fit_points
 
 class BaseGame(arcade.gui.UIView):
     def __init__(self, pypresence_client, game_name, game_key, game_dict):
@@ -24,6 +31,148 @@ class BaseGame(arcade.gui.UIView):
         if not game_key in self.settings:
             self.settings[game_key] = game_dict
 
+        if os.path.exists("settings.json"):
+            with open("settings.json", "r") as file:
+                show_overlay = json.load(file).get("performance_overlay", True)
+        else:
+            show_overlay = True
+
+        self.profiler = FrameProfiler()
+        self.profiler_overlay = ProfilerOverlay(self.profiler, 10, 10) if show_overlay else None
+
+        self.gpu_timer = None
+        self.gpu_timings_label = None
+
+        # instance attributes shadow the subclass methods, which is what the window dispatches events to.
+        # they have to stay bound methods, because the window removes view handlers through weak method references
+        self.on_update = types.MethodType(self.profiler.wrap("Update", type(self).on_update), self)
+        self.on_draw = types.MethodType(self.profiled_draw(type(self).on_draw), self)
+
+    def profiled_draw(self, draw):
+        def on_draw(view):
+            self.profiler.mark_frame()
+
+            with self.profiler.section("Draw"):
+                draw(view)
+
+            if self.profiler_overlay:
+                self.profiler_overlay.draw()
+
+            if self.gpu_timer:
+                self.gpu_timer.poll()
+                self.update_gpu_timings_label()
+
+        return on_draw
+
+    def profile_section(self, name):
+        return self.profiler.section(name)
+
+    def gpu_section(self, name, on_result=None):
+        # created on first use, so simulators without compute shaders never touch GL queries
+        if self.gpu_timer is None:
+            self.gpu_timer = GPUTimer(self.profiler)
+
+        return self.gpu_timer.section(name, on_result)
+
+    def gpu_timings(self):
+        return {name.removeprefix("GPU "): summary for name, summary in self.profiler.summaries().items() if name.startswith("GPU ")}
+
+    def add_gpu_timings_label(self):
+        self.gpu_timings_label = self.settings_box.add(arcade.gui.UILabel(text="GPU timings: waiting for results", multiline=True, width=self.window.width * 0.19))
+
+    def update_gpu_timings_label(self):
+        if self.gpu_timings_label is None or not self.profiler.refresh_due("GPU timings"):
+            return
+
+        timings = self.gpu_timings()
+        if timings:
+            self.gpu_timings_label.text = "GPU timings:\n" + "\n".join(f"{name}: {summary['mean_ms']:.3f} ms (p99 {summary['p99_ms']:.3f})" for name, summary in timings.items())
+
+    def export_gpu_timings(self):
+        timings = self.gpu_timings()
+        if not timings:
+            return
+
+        for name, summary in timings.items():
+            logging.info(f"GPU timing for {self.game_key} {name}: mean {summary['mean_ms']:.3f} ms, p50 {summary['p50_ms']:.3f} ms, p99 {summary['p99_ms']:.3f} ms")
+
+        # one file for every simulator, so the latest numbers of each shader can be compared side by side
+        timings_path = os.path.join(log_dir, "gpu_timings.json")
+
+        if os.path.exists(timings_path):
+            with open(timings_path, "r") as file:
+                all_timings = json.load(file)
+        else:
+            all_timings = {}
+
+        all_timings[self.game_key] = {
+            "renderer": self.window.ctx.info.RENDERER,
+            "timings": timings
+        }
+
+        os.makedirs(log_dir, exist_ok=True)
+        with open(timings_path, "w") as file:
+            file.write(json.dumps(all_timings, indent=4))
+
+    def on_hide_view(self):
+        super().on_hide_view()
+
+        if self.gpu_timer is not None:
+            self.gpu_timer.poll()
+            self.export_gpu_timings()
+
+            self.gpu_timer.delete()
+            self.gpu_timer = None
+
+    def add_point_set_settings(self):
+        # for the simulators with a replace_points method, the generated or loaded points replace all of their points
+        current_settings = self.settings[self.game_key]
+        current_settings.setdefault("point_generator", "Uniform")
+        current_settings.setdefault("point_count", 10000)
+        current_settings.setdefault("point_seed", 0)
+        current_settings.setdefault("points_file", "points.npy")
+
+        self.add_setting("Generated Points: {value}", 1000, 100000, 1000, "point_count")
+        self.add_setting("Generator Seed: {value}", 0, 100, 1, "point_seed")
+
+        self.point_generator_button = self.settings_box.add(arcade.gui.UITextureButton(text=f"Generator: {current_settings['point_generator']}", texture=button_texture, texture_hovered=button_hovered_texture, width=self.window.width * 0.2, style=button_style))
+        self.point_generator_button.on_click = lambda event: self.switch_point_generator()
+
+        self.generate_points_button = self.settings_box.add(arcade.gui.UITextureButton(text="Generate points", texture=button_texture, texture_hovered=button_hovered_texture, width=self.window.width * 0.2, style=button_style))
+        self.generate_points_button.on_click = lambda event: self.generate_point_set()
+
+        self.load_points_button = self.settings_box.add(arcade.gui.UITextureButton(text=f"Load {os.path.basename(current_settings['points_file'])}", texture=button_texture, texture_hovered=button_hovered_texture, width=self.window.width * 0.2, style=button_style))
+        self.load_points_button.on_click = lambda event: self.load_point_set()
+
+    def switch_point_generator(self):
+        current_settings = self.settings[self.game_key]
+        kinds = list(GENERATORS)
+
+        current_settings["point_generator"] = kinds[(kinds.index(current_settings["point_generator"]) + 1) % len(kinds)]
+        self.point_generator_button.text = f"Generator: {current_settings['point_generator']}"
+
+    def generate_point_set(self):
+        current_settings = self.settings[self.game_key]
+
+        with self.profile_section("Point generation"):
+            points = generate_points(current_settings["point_generator"], int(current_settings["point_count"]), self.window.width * 0.8, self.window.height, int(current_settings["point_seed"]))
+
+        self.replace_points(points)
+
+    def load_point_set(self):
+        # the file is set with points_file in data.json, relative paths start in the game directory
+        path = self.settings[self.game_key]["points_file"]
+
+        try:
+            points = fit_points(load_points(path), self.window.width * 0.8, self.window.height)
+        except (OSError, ValueError) as error:
+            logging.warning(f"Could not load points from {path}: {error}")
+            self.load_points_button.text = f"Could not load {os.path.basename(path)}"
+            return
+
+        self.load_points_button.text = f"Load {os.path.basename(path)}"
+        self.replace_points(points)
+
     def add_setting(self, text, min_value, max_value, step, settings_key):
         label = self.settings_box.add(arcade.gui.UILabel(text.format(value=self.settings[self.game_key][settings_key])))
         slider = self.settings_box.add(arcade.gui.UISlider(value=self.settings[self.game_key][settings_key], min_value=min_value, max_value=max_value, step=step))
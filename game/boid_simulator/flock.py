@@ -0,0 +1,133 @@
+import numpy as np, random, math
+
+from game.boid_simulator.spatial_hash import SpatialHash
+
+WEIGHT_KEYS = ["w_separation", "w_alignment", "w_cohesion"]
+
+def sum_by_boid(boid_indices, values_x, values_y, boid_count):
+    return np.stack([np.bincount(boid_indices, weights=values_x, minlength=boid_count), np.bincount(boid_indices, weights=values_y, minlength=boid_count)], axis=1).astype(np.float64, copy=False)
+
+def normalize(vectors):
+    lengths = np.hypot(vectors[:, 0], vectors[:, 1])[:, None]
+
+    return np.divide(vectors, lengths, out=vectors.copy(), where=lengths > 0)
+
+def step_boids(positions, directions, weights, small_radius, large_radius, velocity, radius, width, height, spatial_hash):
+    boid_count = len(positions)
+
+    spatial_hash.rebuild(positions, large_radius)
+    boid_indices, neighbour_indices = spatial_hash.pairs()
+
+    # work in the spatial hash order so the gathers below stay cache friendly
+    order = spatial_hash.order
+    positions, directions, weights = positions[order], directions[order], weights[order]
+    x, y = np.ascontiguousarray(positions[:, 0]), np.ascontiguousarray(positions[:, 1])
+
+    offsets_x = x[boid_indices] - x[neighbour_indices]
+    offsets_y = y[boid_indices] - y[neighbour_indices]
+    distances_squared = offsets_x * offsets_x + offsets_y * offsets_y
+
+    in_large = (distances_squared <= large_radius * large_radius) & (boid_indices != neighbour_indices)
+    boid_indices, neighbour_indices = boid_indices[in_large], neighbour_indices[in_large]
+    offsets_x, offsets_y, distances_squared = offsets_x[in_large], offsets_y[in_large], distances_squared[in_large]
+
+    in_small = distances_squared <= small_radius * small_radius
+    small_indices = boid_indices[in_small]
+
+    large_counts = np.bincount(boid_indices, minlength=boid_count)[:, None]
+    small_counts = np.bincount(small_indices, minlength=boid_count)[:, None]
+
+    separation = normalize(sum_by_boid(small_indices, offsets_x[in_small], offsets_y[in_small], boid_count))
+    alignment = normalize(sum_by_boid(boid_indices, directions[neighbour_indices, 0], directions[neighbour_indices, 1], boid_count))
+    cohesion = normalize(sum_by_boid(boid_indices, x[neighbour_indices], y[neighbour_indices], boid_count) / np.maximum(large_counts, 1) - positions)
+
+    # boids without neighbours keep their current direction for that term
+    separation = np.where(small_counts > 0, separation, directions)
+    alignment = np.where(large_counts > 0, alignment, directions)
+    cohesion = np.where(large_counts > 0, cohesion, directions)
+
+    new_directions = weights[:, 0:1] * separation + weights[:, 1:2] * alignment + weights[:, 2:3] * cohesion
+
+    lengths = np.hypot(new_directions[:, 0], new_directions[:, 1])[:, None]
+    new_directions = np.divide(new_directions, lengths, out=new_directions, where=lengths > 1)
+
+    new_positions = positions + new_directions * velocity
+    angles = 90 - np.degrees(np.arctan2(new_directions[:, 1], new_directions[:, 0]))
+
+    # reflecting on an axis aligned wall only flips the matching component
+    for axis, maximum in ((0, width * 0.8), (1, height)):
+        low = new_positions[:, axis] <= radius
+        high = ~low & (new_positions[:, axis] >= maximum - radius)
+
+        new_positions[low, axis] = radius
+        new_positions[high, axis] = maximum - radius
+        new_directions[low | high, axis] *= -1
+
+    unsorted_positions, unsorted_directions, unsorted_angles = np.empty_like(new_positions), np.empty_like(new_directions), np.empty_like(angles)
+    unsorted_positions[order], unsorted_directions[order], unsorted_angles[order] = new_positions, new_directions, angles
+
+    return unsorted_positions, unsorted_directions, unsorted_angles
+
+class Flock():
+    def __init__(self, capacity=64):
+        # the arrays have room for capacity boids and double when they fill up, so adding a boid does not copy the flock.
+        # positions, directions, weights and angles are views of the first count rows
+        self.count = 0
+        self.allocate(capacity)
+
+        self.velocity = 5
+        self.radius = 10
+
+        self.small_radius = 100
+        self.large_radius = 250
+
+        self.spatial_hash = SpatialHash()
+
+    def __len__(self):
+        return self.count
+
+    def allocate(self, capacity):
+        self.capacity = capacity
+
+        self.position_data = np.resize(getattr(self, "position_data", np.empty((0, 2))), (capacity, 2))
+        self.direction_data = np.resize(getattr(self, "direction_data", np.empty((0, 2))), (capacity, 2))
+        self.weight_data = np.resize(getattr(self, "weight_data", np.empty((0, 3))), (capacity, 3))
+        self.angle_data = np.resize(getattr(self, "angle_data", np.empty(0)), capacity)
+
+        self.update_views()
+
+    def update_views(self):
+        self.positions = self.position_data[:self.count]
+        self.directions = self.direction_data[:self.count]
+        self.weights = self.weight_data[:self.count]
+        self.angles = self.angle_data[:self.count]
+
+    def add_boid(self, x, y, w_separation, w_alignment, w_cohesion):
+        random_angle = random.randint(0, 361)
+
+        if self.count == self.capacity:
+            self.allocate(self.capacity * 2)
+
+        index = self.count
+        self.position_data[index] = x, y
+        self.direction_data[index] = math.cos(random_angle), math.sin(random_angle)
+        self.weight_data[index] = w_separation, w_alignment, w_cohesion
+        self.angle_data[index] = 0
+
+        self.count += 1
+        self.update_views()
+
+        return index
+
+    def set_value(self, key, value):
+        if key in WEIGHT_KEYS:
+            self.weights[:, WEIGHT_KEYS.index(key)] = value
+        else:
+            setattr(self, key, value)
+
+    def update(self, window_width, window_height):
+        self.positions[:], self.directions[:], self.angles[:] = step_boids(
+            self.positions, self.directions, self.weights,
+            self.small_radius, self.large_radius, self.velocity, self.radius,
+            window_width, window_height, self.spatial_hash
+        )
@@ -1,6 +1,8 @@
-import arcade, random
+import arcade, arcade.gui, random, time, os
 
-from game.boid_simulator.boid import Boid
+from game.boid_simulator.flock import Flock
+from game.boid_simulator.renderer import FlockRenderer
+from game.boid_simulator.parallel import ParallelFlock
 from game.base import BaseGame
 
 class Game(BaseGame):
@@ -10,11 +12,18 @@ class Game(BaseGame):
                 "w_alignment": 1.0,
                 "w_cohesion": 1.0,
                 "small_radius": 100,
-                "large_radius": 250
+                "large_radius": 250,
+                "parallel_workers": 0
         })
 
-        self.current_boid_num = 1
-        self.boid_sprites = arcade.SpriteList()
+        self.flock = Flock()
+        self.flock.small_radius = self.settings["boid_simulator"]["small_radius"]
+        self.flock.large_radius = self.settings["boid_simulator"]["large_radius"]
+
+        self.flock_renderer = FlockRenderer(self.window.ctx)
+
+        self.parallel_flock = None
+        self.parallel_workers_changed = None
 
         self.add_setting("Separation Weight: {value}", 0.1, 5, 0.1, "w_separation")
         self.add_setting("Alignment Weight: {value}", 0.1, 5, 0.1, "w_alignment")
@@ -22,23 +31,36 @@ class Game(BaseGame):
         self.add_setting("Small Radius: {value}", 25, 250, 25, "small_radius")
         self.add_setting("Large Radius: {value}", 50, 500, 50, "large_radius")
 
+        self.settings["boid_simulator"].setdefault("parallel_workers", 0)
+        self.add_setting("Worker Processes (0 = off): {value}", 0, os.cpu_count() or 1, 1, "parallel_workers")
+        self.worker_timings_label = self.settings_box.add(arcade.gui.UILabel(text="Worker timings: off", multiline=True, width=self.window.width * 0.19))
+
+        self.setup_parallel_flock()
+
     def change_value(self, label, text, boid_variable, value):
         super().change_value(label, text, boid_variable, value)
-  
-        for boid in self.boid_sprites:
-            setattr(boid, boid_variable, value)
 
-    def create_boid(self, x, y):
-        boid = Boid(self.current_boid_num, x, y)
-        
-        boid.w_alignment = self.settings["boid_simulator"]["w_alignment"]
-        boid.w_separation = self.settings["boid_simulator"]["w_separation"]
-        boid.w_cohesion = self.settings["boid_simulator"]["w_cohesion"]
-        boid.large_radius = self.settings["boid_simulator"]["large_radius"]
-        boid.small_radius = self.settings["boid_simulator"]["small_radius"]
+        if boid_variable == "parallel_workers":
+            # starting a pool takes a while, so it is only recreated once the slider has rested for a moment
+            self.parallel_workers_changed = time.perf_counter()
+        else:
+            self.flock.set_value(boid_variable, value)
+
+    def setup_parallel_flock(self):
+        if self.parallel_flock is not None:
+            self.parallel_flock.close()
+            self.parallel_flock = None
+
+        worker_count = int(self.settings["boid_simulator"]["parallel_workers"])
+
+        if worker_count > 0:
+            self.parallel_flock = ParallelFlock(worker_count)
 
-        self.boid_sprites.append(boid)
-        self.current_boid_num += 1
+        if self.parallel_flock is None:
+            self.worker_timings_label.text = "Worker timings: off"
+
+    def create_boid(self, x, y):
+        self.flock.add_boid(x, y, self.settings["boid_simulator"]["w_separation"], self.settings["boid_simulator"]["w_alignment"], self.settings["boid_simulator"]["w_cohesion"])
 
     def setup_boids(self):
         for i in range(25):
@@ -48,14 +70,33 @@ class Game(BaseGame):
         super().on_show_view()
         self.setup_boids()
 
+    def on_hide_view(self):
+        super().on_hide_view()
+
+        if self.parallel_flock is not None:
+            self.parallel_flock.close()
+            self.parallel_flock = None
+
+        self.parallel_workers_changed = None
+
     def on_update(self, delta_time):
-        boid_directions = [(boid.boid_num, boid.direction, arcade.math.Vec2(*boid.position)) for boid in self.boid_sprites]
-        for boid in self.boid_sprites:
-            boid.update(self.window.width, self.window.height, boid_directions)
+        if self.parallel_workers_changed is not None and time.perf_counter() - self.parallel_workers_changed > 0.5:
+            self.parallel_workers_changed = None
+            self.setup_parallel_flock()
+
+        if self.parallel_flock is not None and self.parallel_flock.is_ready():
+            self.parallel_flock.update(self.flock, self.window.width, self.window.height)
+
+            if self.profiler.refresh_due("Worker timings"):
+                self.worker_timings_label.text = f"Worker timings: {self.parallel_flock.timings_text()}"
+        else:
+            self.flock.update(self.window.width, self.window.height)
 
         if self.window.mouse[arcade.MOUSE_BUTTON_LEFT]:
             self.create_boid(self.window.mouse.data["x"], self.window.mouse.data["y"])
 
     def on_draw(self):
         super().on_draw()
-        self.boid_sprites.draw()
\ No newline at end of file
+
+        self.flock_renderer.update(self.flock)
+        self.flock_renderer.draw()
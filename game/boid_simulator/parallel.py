@@ -0,0 +1,119 @@
+import numpy as np, multiprocessing, logging, time, os
+
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+
+from game.boid_simulator.flock import step_boids
+from game.boid_simulator.spatial_hash import SpatialHash
+
+# per boid columns of the shared state: position, direction and weights are read, the step result is written
+POSITION, DIRECTION, WEIGHTS, NEW_POSITION, NEW_DIRECTION, NEW_ANGLE = slice(0, 2), slice(2, 4), slice(4, 7), slice(7, 9), slice(9, 11), 11
+FIELD_COUNT = 12
+
+attached_memory = {}
+
+def attach_state(memory_name, capacity):
+    if memory_name not in attached_memory:
+        for old_memory in attached_memory.values(): # the main process reallocated, the old block is gone
+            old_memory.close()
+
+        attached_memory.clear()
+        attached_memory[memory_name] = shared_memory.SharedMemory(name=memory_name)
+
+    return np.ndarray((capacity, FIELD_COUNT), dtype=np.float64, buffer=attached_memory[memory_name].buf)
+
+def step_partition(memory_name, capacity, boid_count, x_start, x_end, small_radius, large_radius, velocity, radius, window_width, window_height):
+    start = time.perf_counter()
+
+    state = attach_state(memory_name, capacity)[:boid_count]
+    x = state[:, POSITION][:, 0]
+
+    # the halo holds every boid that can be a neighbour of a boid owned by this partition
+    halo_indices = np.flatnonzero((x >= x_start - large_radius) & (x < x_end + large_radius))
+    owned = (x[halo_indices] >= x_start) & (x[halo_indices] < x_end)
+
+    positions, directions, angles = step_boids(
+        state[halo_indices, POSITION], state[halo_indices, DIRECTION], state[halo_indices, WEIGHTS],
+        small_radius, large_radius, velocity, radius, window_width, window_height, SpatialHash()
+    )
+
+    owned_indices = halo_indices[owned]
+    state[owned_indices, NEW_POSITION] = positions[owned]
+    state[owned_indices, NEW_DIRECTION] = directions[owned]
+    state[owned_indices, NEW_ANGLE] = angles[owned]
+
+    return os.getpid(), len(owned_indices), len(halo_indices) - len(owned_indices), time.perf_counter() - start
+
+def worker_ready():
+    return os.getpid()
+
+class ParallelFlock():
+    def __init__(self, worker_count):
+        # spawned workers start from a clean interpreter instead of a copy of the process with its GL context and threads,
+        # the state reaches them through shared memory so nothing big is pickled
+        self.worker_count = worker_count
+        self.executor = ProcessPoolExecutor(max_workers=worker_count, mp_context=multiprocessing.get_context("spawn"))
+
+        # starting the workers takes a moment, the game keeps stepping in its own process until they are up
+        self.warmup = [self.executor.submit(worker_ready) for _ in range(worker_count)]
+
+        self.memory = None
+        self.capacity = 0
+
+        self.timings = []
+
+    def allocate(self, capacity):
+        self.release_memory()
+
+        self.memory = shared_memory.SharedMemory(create=True, size=capacity * FIELD_COUNT * 8)
+        self.capacity = capacity
+        self.state = np.ndarray((capacity, FIELD_COUNT), dtype=np.float64, buffer=self.memory.buf)
+
+    def release_memory(self):
+        if self.memory is not None:
+            del self.state
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
+
+    def update(self, flock, window_width, window_height):
+        boid_count = len(flock)
+        if not boid_count:
+            return
+
+        if boid_count > self.capacity:
+            self.allocate(max(boid_count, self.capacity * 2, 1024))
+
+        state = self.state[:boid_count]
+        state[:, POSITION] = flock.positions
+        state[:, DIRECTION] = flock.directions
+        state[:, WEIGHTS] = flock.weights
+
+        # equal sized vertical strips, the outer strips extend to infinity so every boid has an owner
+        boundaries = np.concatenate([[-np.inf], np.quantile(flock.positions[:, 0], np.linspace(0, 1, self.worker_count + 1)[1:-1]), [np.inf]])
+
+        futures = [
+            self.executor.submit(
+                step_partition, self.memory.name, self.capacity, boid_count, boundaries[i], boundaries[i + 1],
+                flock.small_radius, flock.large_radius, flock.velocity, flock.radius, window_width, window_height
+            )
+            for i in range(self.worker_count)
+        ]
+
+        self.timings = [future.result() for future in futures]
+
+        flock.positions[:] = state[:, NEW_POSITION]
+        flock.directions[:] = state[:, NEW_DIRECTION]
+        flock.angles[:] = state[:, NEW_ANGLE]
+
+    def is_ready(self):
+        return all(future.done() for future in self.warmup)
+
+    def timings_text(self):
+        return ", ".join(f"{round(elapsed * 1000, 2)} ms ({owned} + {halo} halo)" for _, owned, halo, elapsed in self.timings)
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+        self.release_memory()
+
+        logging.debug(f"Closed boid worker pool with {self.worker_count} workers.")
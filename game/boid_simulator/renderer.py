@@ -0,0 +1,97 @@
+import numpy as np
+
+from arcade.gl import BufferDescription
+
+vertex_shader_source = """#version 330
+
+uniform WindowBlock {
+    mat4 projection;
+    mat4 view;
+} window;
+
+in vec2 in_vert;
+in vec2 in_uv;
+
+in vec2 in_position;
+in float in_angle;
+
+out vec2 v_uv;
+
+void main() {
+    // sprite angles are clockwise, so rotate by the negated angle
+    float angle = radians(-in_angle);
+    mat2 rotate = mat2(
+        cos(angle), sin(angle),
+        -sin(angle), cos(angle)
+    );
+
+    gl_Position = window.projection * window.view * vec4(in_position + (rotate * in_vert), 0.0, 1.0);
+    v_uv = in_uv;
+}
+"""
+
+fragment_shader_source = """#version 330
+
+uniform sampler2D boid_texture;
+
+in vec2 v_uv;
+
+out vec4 frag_color;
+
+void main() {
+    frag_color = texture(boid_texture, v_uv);
+
+    if (frag_color.a == 0.0) {
+        discard;
+    }
+}
+"""
+
+class FlockRenderer():
+    def __init__(self, ctx, texture_path="assets/graphics/boid.png", capacity=1024):
+        self.ctx = ctx
+
+        self.program = ctx.program(vertex_shader=vertex_shader_source, fragment_shader=fragment_shader_source)
+        self.program["boid_texture"] = 0
+
+        self.texture = ctx.load_texture(texture_path)
+
+        half_width, half_height = self.texture.width / 2, self.texture.height / 2
+        self.quad_buffer = ctx.buffer(data=np.array([
+            -half_width, -half_height, 0, 0,
+            half_width, -half_height, 1, 0,
+            -half_width, half_height, 0, 1,
+            half_width, half_height, 1, 1
+        ], dtype=np.float32).tobytes())
+
+        self.instance_count = 0
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        # x, y and angle per boid
+        self.capacity = capacity
+        self.instance_data = np.zeros((capacity, 3), dtype=np.float32)
+        self.instance_buffer = self.ctx.buffer(reserve=self.instance_data.nbytes)
+
+        self.geometry = self.ctx.geometry([
+            BufferDescription(self.quad_buffer, "2f 2f", ["in_vert", "in_uv"]),
+            BufferDescription(self.instance_buffer, "2f 1f", ["in_position", "in_angle"], instanced=True)
+        ], mode=self.ctx.TRIANGLE_STRIP)
+
+    def update(self, flock):
+        self.instance_count = len(flock)
+
+        if self.instance_count > self.capacity:
+            self.allocate(max(self.instance_count, self.capacity * 2))
+
+        self.instance_data[:self.instance_count, :2] = flock.positions
+        self.instance_data[:self.instance_count, 2] = flock.angles
+
+        self.instance_buffer.write(self.instance_data[:self.instance_count])
+
+    def draw(self):
+        if not self.instance_count:
+            return
+
+        self.texture.use(0)
+        self.geometry.render(self.program, instances=self.instance_count)
@@ -0,0 +1,53 @@
+import numpy as np
+
+class SpatialHash():
+    def __init__(self, cell_size=1, subdivisions=2):
+        # cells are a fraction of the query radius, so the scanned block hugs the query circle more closely
+        self.cell_size = cell_size
+        self.subdivisions = subdivisions
+
+        self.cells = np.empty((0, 2), dtype=np.int64)
+        self.order = np.empty(0, dtype=np.int64)
+        self.sorted_keys = np.empty(0, dtype=np.int64)
+
+    def cell_keys(self, cells_x, cells_y):
+        # cells in the same column have consecutive keys, so a whole column of the block is one sorted range
+        return (cells_x - self.min_cell[0] + self.subdivisions) * (self.span[1] + 2 * self.subdivisions + 1) + (cells_y - self.min_cell[1] + self.subdivisions)
+
+    def rebuild(self, positions, radius):
+        self.cell_size = max(radius, 1) / self.subdivisions
+        self.cells = np.floor(positions / self.cell_size).astype(np.int64)
+
+        if len(self.cells):
+            self.min_cell = self.cells.min(axis=0)
+            self.span = self.cells.max(axis=0) - self.min_cell
+        else:
+            self.min_cell = self.span = np.zeros(2, dtype=np.int64)
+
+        keys = self.cell_keys(self.cells[:, 0], self.cells[:, 1])
+
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.order]
+
+    def pairs(self):
+        # every (boid, candidate) pair from the block of cells within one radius of each boid, self pairs included.
+        # indices refer to the cell sorted order, which keeps neighbouring boids close together in memory
+        sorted_cells = self.cells[self.order]
+        starts, counts = [], []
+
+        for offset_x in range(-self.subdivisions, self.subdivisions + 1):
+            column = sorted_cells[:, 0] + offset_x
+
+            column_starts = np.searchsorted(self.sorted_keys, self.cell_keys(column, sorted_cells[:, 1] - self.subdivisions), side="left")
+            column_ends = np.searchsorted(self.sorted_keys, self.cell_keys(column, sorted_cells[:, 1] + self.subdivisions), side="right")
+
+            starts.append(column_starts)
+            counts.append(column_ends - column_starts)
+
+        starts, counts = np.concatenate(starts), np.concatenate(counts)
+        boid_indices = np.tile(np.arange(len(self.cells)), 2 * self.subdivisions + 1)
+
+        # candidates of one range are consecutive, so shifting a running counter by each range start enumerates all of them
+        range_offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+
+        return np.repeat(boid_indices, counts), np.arange(len(range_offsets)) + range_offsets
@@ -1,6 +1,7 @@
 import pyglet, arcade, arcade.gui, os, json, numpy as np
 
 from game.chladni_plate_simulator.shader import create_shader
+from game.site_index import SiteIndex
 from game.base import BaseGame
 
 from utils.preload import button_texture, button_hovered_texture
@@ -13,6 +14,7 @@ class Game(BaseGame):
         })
 
         self.sources = np.empty((0, 2), dtype=np.float32)
+        self.site_index = SiteIndex()
         
         self.dragged_source = None
         self.needs_redraw = False
@@ -31,7 +33,8 @@ class Game(BaseGame):
             with self.shader_program:
                 self.shader_program["source_count"] = len(self.sources)
                 self.shader_program["k"] = self.settings["chladni_plate_simulator"]["k"]
-                self.shader_program.dispatch(int(self.plate_image.width / 32), int(self.plate_image.height / 32), 1)
+                with self.gpu_section("Chladni plate"):
+                    self.shader_program.dispatch(int(self.plate_image.width / 32), int(self.plate_image.height / 32), 1)
 
     def setup(self):
         self.shader_program, self.plate_image, self.sources_ssbo = create_shader(int(self.window.width * 0.8), self.window.height)
@@ -40,19 +43,18 @@ class Game(BaseGame):
         
     def add_source(self):
         self.sources = np.vstack([self.sources, [self.window.width * 0.4, self.window.height / 2]]).astype(np.float32)
+        self.site_index.add(self.sources[-1])
 
         self.needs_redraw = True
         
     def on_mouse_press(self, x, y, button, modifiers):
-        if not self.dragged_source:
-            for i, source in enumerate(self.sources.reshape(-1, 2)):
-                if arcade.math.Vec2(x, y).distance(arcade.math.Vec2(*source)) <= 10:
-                    self.dragged_source = i
-                    break
+        if self.dragged_source is None:
+            self.dragged_source = self.site_index.pick(x, y, 10)
 
     def on_mouse_drag(self, x, y, dx, dy, _buttons, _modifiers):
         if self.dragged_source is not None:
             self.sources[self.dragged_source] = [x, y]
+            self.site_index.move(self.dragged_source, (x, y))
 
     def on_mouse_release(self, x, y, button, modifiers):
         self.dragged_source = None
@@ -66,6 +68,8 @@ class Game(BaseGame):
         self.add_source_button = self.settings_box.add(arcade.gui.UITextureButton(text="Add source", texture=button_texture, texture_hovered=button_hovered_texture, style=button_style, width=self.window.width * 0.2))
         self.add_source_button.on_click = lambda event: self.add_source()
 
+        self.add_gpu_timings_label()
+
         self.setup()
 
     def on_key_press(self, symbol, modifiers):
@@ -74,6 +78,7 @@ class Game(BaseGame):
         if symbol == arcade.key.C:
             del self.sources
             self.sources = np.empty((0, 2), dtype=np.float32)
+            self.site_index.clear()
 
             self.needs_redraw = True
 
@@ -1,87 +1,168 @@
-import arcade, arcade.gui, numpy as np, random, math
-
-from scipy.spatial import Delaunay
+import arcade, arcade.gui, numpy as np, random
 
+from game.delaunay_simulator.triangulation import IncrementalDelaunay
+from game.delaunay_simulator.renderer import MeshRenderer
+from game.delaunay_simulator.worker import TriangulationWorker
+from game.site_index import SiteIndex
 from game.base import BaseGame
 
 from utils.constants import button_style
 from utils.preload import button_texture, button_hovered_texture
 
+# more new points than this in one update are triangulated from scratch instead of one by one
+BULK_INSERT_SIZE = 64
+
 class Game(BaseGame):
     def __init__(self, pypresence_client):
         super().__init__(pypresence_client, "Delaunay Triangulation", "delaunay_simulator", {})
 
-        self.points = []
+        # the points live in the site index, so big point sets stay one NumPy array
+        self.site_index = SiteIndex()
+
+        # points added or moved since the last update, applied to the triangulation one by one
+        self.new_points = []
+        self.moved_points = set()
 
         [self.add_point() for _ in range(4)]
         
         self.fixed_points = [(0, 0), (0, self.window.height), (self.window.width * 0.8, 0), (self.window.width * 0.8, self.window.height)]
 
-        self.triangles = None
+        # the fixed points come first in the triangulation, so point i is vertex i + 4 there
+        self.triangulation = IncrementalDelaunay()
+        self.mesh_renderer = MeshRenderer(self.window.ctx)
         self.dragged_point = None
 
-        self.needs_recalc = True
-
-    def fract(self, x):
-        return x - math.floor(x)
+        # full rebuilds run on the worker, the mesh on screen stays the last finished one until the newest requested one arrives
+        self.worker = None
+        self.generation = 0
+        self.rebuilding = False
+        self.rebuild_failed = False
+        self.rebuild_count = 0
 
-    def hash3(self, p: float) -> arcade.math.Vec3:
-        p3 = arcade.math.Vec3(p * 127.1, p * 311.7, p * 74.7)
-        return arcade.math.Vec3(
-            int(self.fract(math.sin(p3.x) * 43758.5453123) * 255),
-            int(self.fract(math.sin(p3.y) * 43758.5453123) * 255),
-            int(self.fract(math.sin(p3.z) * 43758.5453123) * 255)
-        )
+        self.needs_recalc = True
     
     def on_show_view(self):
         super().on_show_view()
 
+        self.worker = TriangulationWorker()
+
         self.add_point_button = self.settings_box.add(arcade.gui.UITextureButton(width=self.window.width * 0.2, text="Add Point", texture=button_texture, texture_hovered=button_hovered_texture, style=button_style))
         self.add_point_button.on_click = lambda event: self.add_point()
 
+        self.add_random_points_button = self.settings_box.add(arcade.gui.UITextureButton(width=self.window.width * 0.2, text="Add 1000 random points", texture=button_texture, texture_hovered=button_hovered_texture, style=button_style))
+        self.add_random_points_button.on_click = lambda event: [self.add_point() for _ in range(1000)]
+
+        self.add_point_set_settings()
+
+        self.triangulation_label = self.settings_box.add(arcade.gui.UILabel(text="Triangles: 0", multiline=True, width=self.window.width * 0.19))
+
+    def on_hide_view(self):
+        super().on_hide_view()
+
+        if self.worker is not None:
+            self.worker.close()
+            self.worker = None
+
     def change_value(self, label, text, settings_key, value):
         super().change_value(label, text, settings_key, value)
 
         self.needs_recalc = True
 
     def add_point(self):
-        self.points.append((random.randint(0, (self.window.width * 0.8)), random.randint(0, self.window.height - 0)))
+        self.new_points.append(self.site_index.add((random.randint(0, (self.window.width * 0.8)), random.randint(0, self.window.height - 0))))
+
+    def replace_points(self, points):
+        self.site_index = SiteIndex(points)
+
+        # a big set already built its tree while being added
+        if self.site_index.stale:
+            self.site_index.rebuild()
+
+        self.dragged_point = None
+        self.new_points.clear()
+        self.moved_points.clear()
 
         self.needs_recalc = True
 
+    def positions(self):
+        return np.vstack([np.array(self.fixed_points, dtype=np.float64), self.site_index.sites()])
+
     def on_mouse_press(self, x, y, button, modifiers):
-        if not self.dragged_point:
-            for i, point in enumerate(self.points):
-                if arcade.math.Vec2(x, y).distance(arcade.math.Vec2(*point)) <= 10:
-                    self.dragged_point = i
-                    break
+        if self.dragged_point is None:
+            self.dragged_point = self.site_index.pick(x, y, 10)
 
     def on_mouse_drag(self, x, y, dx, dy, _buttons, _modifiers):
         if self.dragged_point is not None:
-            self.points[self.dragged_point] = [x, y]
-            self.needs_recalc = True
+            self.site_index.move(self.dragged_point, (x, y))
+            self.moved_points.add(self.dragged_point)
 
     def on_mouse_release(self, x, y, button, modifiers):
         self.dragged_point = None
-        self.needs_recalc = True
 
     def on_draw(self):
         super().on_draw()
 
-        if self.triangles is not None:
-            for n, simplex in enumerate(self.triangles):
-                points = self.points + self.fixed_points
-                p1 = points[simplex[0]]
-                p2 = points[simplex[1]]
-                p3 = points[simplex[2]]
+        self.mesh_renderer.draw()
 
-                arcade.draw_triangle_filled(p1[0], p1[1], p2[0], p2[1], p3[0], p3[1], self.hash3(n))
+    def request_rebuild(self):
+        self.generation += 1
+        self.rebuilding = True
 
-        for point in self.points + self.fixed_points:
-            arcade.draw_circle_filled(point[0] + 5, point[1] + 5, 10, arcade.color.GRAY)
+        self.worker.request(self.positions(), self.generation)
 
-    def on_update(self, delta_time):
-        if self.needs_recalc:
-            self.needs_recalc = False
+    def update_triangulation_label(self):
+        if not self.profiler.refresh_due("Triangulation"):
+            return
+
+        rebuild = self.profiler.summary("Triangulation rebuild")
+        incremental = self.profiler.summary("Triangulation update")
+        frame = self.profiler.summary("Frame")
 
-            self.triangles = Delaunay(np.array(self.points + self.fixed_points)).simplices
\ No newline at end of file
+        self.triangulation_label.text = f"Triangles: {len(self.triangulation.triangle_list())}\nFull rebuilds: {self.rebuild_count}{' (running)' if self.rebuilding else ' (failed)' if self.rebuild_failed else ''}\nRebuild: {rebuild['mean_ms']:.2f} ms\nIncremental: {incremental['mean_ms']:.2f} ms\nFrame: {frame['mean_ms']:.2f} ms"
+
+    def on_update(self, delta_time):
+        result = self.worker.take_result()
+        if result is not None and result[0] is None:
+            # the last mesh stays, and the next change asks for a rebuild again
+            self.rebuilding = False
+            self.rebuild_failed = True
+        elif result is not None:
+            self.triangulation, generation, elapsed = result
+            self.profiler.record("Triangulation rebuild", elapsed)
+            self.rebuild_count += 1
+
+            # an older result is still shown, but the points changed since it was requested so the newest one is still needed
+            self.rebuilding = generation != self.generation
+            self.rebuild_failed = False
+
+            self.mesh_renderer.update_triangles(self.triangulation)
+            self.mesh_renderer.update_points(self.positions(), None)
+
+        self.update_triangulation_label()
+
+        if not (self.needs_recalc or self.new_points or self.moved_points):
+            return
+
+        fixed_count = len(self.fixed_points)
+        moved_vertices = {fixed_count + index for index in self.moved_points | set(self.new_points)}
+
+        if self.rebuilding or self.rebuild_failed or self.needs_recalc or len(self.new_points) > BULK_INSERT_SIZE:
+            self.request_rebuild()
+        else:
+            # a point added while others moved is placed at its latest position, so it is never moved again after
+            with self.profile_section("Triangulation update"):
+                points = self.site_index.points
+                applied = all(self.triangulation.move(fixed_count + index, points[index]) for index in self.moved_points - set(self.new_points)) and all(self.triangulation.add(points[index]) for index in self.new_points)
+
+            if applied:
+                self.mesh_renderer.update(self.triangulation, moved_vertices)
+            else:
+                self.request_rebuild()
+
+        # while rebuilding only the points follow, the old triangles stay until the worker is done
+        if self.rebuilding:
+            self.mesh_renderer.update_points(self.positions(), moved_vertices)
+
+        self.needs_recalc = False
+        self.new_points.clear()
+        self.moved_points.clear()
@@ -0,0 +1,162 @@
+import numpy as np
+
+from arcade.gl import BufferDescription
+
+POINT_RADIUS = 10
+
+triangle_vertex_shader_source = """#version 330
+
+uniform WindowBlock {
+    mat4 projection;
+    mat4 view;
+} window;
+
+in vec2 in_position;
+in vec3 in_color;
+
+out vec3 v_color;
+
+void main() {
+    gl_Position = window.projection * window.view * vec4(in_position, 0.0, 1.0);
+    v_color = in_color;
+}
+"""
+
+triangle_fragment_shader_source = """#version 330
+
+in vec3 v_color;
+
+out vec4 frag_color;
+
+void main() {
+    frag_color = vec4(v_color, 1.0);
+}
+"""
+
+point_vertex_shader_source = """#version 330
+
+uniform WindowBlock {
+    mat4 projection;
+    mat4 view;
+} window;
+
+uniform float radius;
+
+in vec2 in_vert;
+in vec2 in_position;
+
+out vec2 v_offset;
+
+void main() {
+    // the circles were always drawn 5 pixels up and right of the points
+    gl_Position = window.projection * window.view * vec4(in_position + vec2(5.0) + in_vert * radius, 0.0, 1.0);
+    v_offset = in_vert;
+}
+"""
+
+point_fragment_shader_source = """#version 330
+
+in vec2 v_offset;
+
+out vec4 frag_color;
+
+void main() {
+    if (dot(v_offset, v_offset) > 1.0) {
+        discard;
+    }
+
+    frag_color = vec4(vec3(128.0 / 255.0), 1.0);
+}
+"""
+
+def hash3(p):
+    # in double precision so the colours stay the same as with math.sin
+    p3 = p[:, None] * np.array([127.1, 311.7, 74.7])
+    return ((np.sin(p3) * 43758.5453123) % 1.0 * 255).astype(int)
+
+class MeshRenderer():
+    # the triangles are kept in the same slots as in the triangulation, so a local change only rewrites the slots it touched
+    def __init__(self, ctx, triangle_capacity=1024, point_capacity=1024):
+        self.ctx = ctx
+
+        self.triangle_program = ctx.program(vertex_shader=triangle_vertex_shader_source, fragment_shader=triangle_fragment_shader_source)
+        self.point_program = ctx.program(vertex_shader=point_vertex_shader_source, fragment_shader=point_fragment_shader_source)
+        self.point_program["radius"] = POINT_RADIUS
+
+        self.quad_buffer = ctx.buffer(data=np.array([-1, -1, 1, -1, -1, 1, 1, 1], dtype=np.float32).tobytes())
+
+        self.vertex_count = 0
+        self.point_count = 0
+
+        self.allocate_triangles(triangle_capacity)
+        self.allocate_points(point_capacity)
+
+    def allocate_triangles(self, capacity):
+        # x, y and colour for the 3 vertices of every slot
+        self.triangle_capacity = capacity
+        self.triangle_buffer = self.ctx.buffer(reserve=capacity * 3 * 5 * 4)
+
+        self.triangle_geometry = self.ctx.geometry([
+            BufferDescription(self.triangle_buffer, "2f 3f", ["in_position", "in_color"])
+        ], mode=self.ctx.TRIANGLES)
+
+    def allocate_points(self, capacity):
+        self.point_capacity = capacity
+        self.point_buffer = self.ctx.buffer(reserve=capacity * 2 * 4)
+
+        self.point_geometry = self.ctx.geometry([
+            BufferDescription(self.quad_buffer, "2f", ["in_vert"]),
+            BufferDescription(self.point_buffer, "2f", ["in_position"], instanced=True)
+        ], mode=self.ctx.TRIANGLE_STRIP)
+
+    def slot_data(self, triangulation, slots):
+        # dead slots are written as collapsed triangles, which draw nothing
+        positions = triangulation.positions()
+        data = np.zeros((len(slots), 3, 5), dtype=np.float32)
+
+        alive = triangulation.alive[slots]
+        data[alive, :, :2] = positions[triangulation.triangles[slots[alive]]]
+        data[:, :, 2:] = (hash3(slots.astype(np.float64)) / 255)[:, None, :]
+
+        return data
+
+    def update(self, triangulation, moved_vertices):
+        self.update_triangles(triangulation)
+        self.update_points(triangulation.positions(), moved_vertices)
+
+    def update_triangles(self, triangulation):
+        if triangulation.full_upload or triangulation.capacity > self.triangle_capacity:
+            if triangulation.capacity > self.triangle_capacity:
+                self.allocate_triangles(triangulation.capacity)
+
+            self.triangle_buffer.write(self.slot_data(triangulation, np.arange(triangulation.slot_count)))
+        else:
+            for slot in triangulation.dirty_slots:
+                self.triangle_buffer.write(self.slot_data(triangulation, np.array([slot])), offset=slot * 3 * 5 * 4)
+
+        self.vertex_count = triangulation.slot_count * 3
+
+        triangulation.full_upload = False
+        triangulation.dirty_slots.clear()
+
+    def update_points(self, positions, moved_vertices):
+        positions = np.asarray(positions, dtype=np.float32)
+
+        if len(positions) > self.point_capacity:
+            self.allocate_points(max(len(positions), self.point_capacity * 2))
+            moved_vertices = None
+
+        if moved_vertices is None or len(positions) != self.point_count:
+            self.point_buffer.write(positions)
+        else:
+            for vertex in moved_vertices:
+                self.point_buffer.write(positions[vertex], offset=vertex * 2 * 4)
+
+        self.point_count = len(positions)
+
+    def draw(self):
+        if self.vertex_count:
+            self.triangle_geometry.render(self.triangle_program, vertices=self.vertex_count)
+
+        if self.point_count:
+            self.point_geometry.render(self.point_program, instances=self.point_count)
@@ -0,0 +1,242 @@
+import numpy as np
+
+from scipy.spatial import Delaunay, QhullError
+
+from game.site_index import SiteIndex
+
+def orientation(a, b, c):
+    return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+
+def in_circumcircle(a, b, c, p):
+    # a, b and c are counter clockwise, ties count as outside so cocircular points never grow a cavity
+    ax, ay = a[0] - p[0], a[1] - p[1]
+    bx, by = b[0] - p[0], b[1] - p[1]
+    cx, cy = c[0] - p[0], c[1] - p[1]
+
+    return (ax * ax + ay * ay) * (bx * cy - cx * by) - (bx * bx + by * by) * (ax * cy - cx * ay) + (cx * cx + cy * cy) * (ax * by - bx * ay) > 0
+
+class IncrementalDelaunay():
+    # triangles live in slots that are reused, so the renderer only has to upload the slots in dirty_slots.
+    # single insertions and moves are local (bowyer-watson for inserting, re-triangulating the hole for removing),
+    # anything these can not handle (hull vertices, duplicates, points outside of the hull) makes add and move return False,
+    # the triangulation is left incomplete then and has to be rebuilt
+    def __init__(self, points=()):
+        self.capacity = 1024
+        self.triangles = np.zeros((self.capacity, 3), dtype=np.int64)
+        self.alive = np.zeros(self.capacity, dtype=bool)
+        self.slot_count = 0
+
+        self.rebuild_count = 0
+        self.rebuild(points)
+        self.rebuild_count = 0
+
+    def rebuild(self, points):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+        # a big set already built its tree while being added
+        self.sites = SiteIndex(points)
+        if self.sites.stale:
+            self.sites.rebuild()
+
+        try:
+            simplices = Delaunay(points).simplices if len(points) >= 3 else np.empty((0, 3), dtype=np.int64)
+        except QhullError:
+            simplices = np.empty((0, 3), dtype=np.int64)
+
+        # counter clockwise, the local operations rely on the winding
+        a, b, c = points[simplices[:, 0]], points[simplices[:, 1]], points[simplices[:, 2]]
+        clockwise = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0]) < 0
+        simplices[clockwise] = simplices[clockwise][:, [0, 2, 1]]
+
+        if len(simplices) > self.capacity:
+            self.allocate(len(simplices))
+
+        self.triangles[:len(simplices)] = simplices
+        self.alive[:] = False
+        self.alive[:len(simplices)] = True
+
+        self.slot_count = len(simplices)
+        self.free_slots = []
+
+        # the stars are only filled in when a local operation first touches a vertex, a rebuild just sorts the
+        # corners of all triangles by vertex, which stays in NumPy and does not hold the GIL on the worker thread
+        corners = simplices.ravel()
+        self.star_order = np.argsort(corners)
+        self.star_starts = np.searchsorted(corners[self.star_order], np.arange(len(points) + 1))
+        self.stars = {}
+
+        self.dirty_slots = set()
+        self.full_upload = True
+        self.rebuild_count += 1
+
+    def allocate(self, capacity):
+        self.capacity = max(capacity, self.capacity * 2)
+        self.triangles = np.resize(self.triangles, (self.capacity, 3))
+        self.alive = np.resize(self.alive, self.capacity)
+        self.alive[self.slot_count:] = False
+
+    def star(self, vertex):
+        # the slots of the triangles around vertex
+        if vertex not in self.stars:
+            if vertex + 1 < len(self.star_starts):
+                self.stars[vertex] = set((self.star_order[self.star_starts[vertex]:self.star_starts[vertex + 1]] // 3).tolist())
+            else:
+                self.stars[vertex] = set()
+
+        return self.stars[vertex]
+
+    def positions(self):
+        return self.sites.sites()
+
+    def triangle_list(self):
+        return self.triangles[:self.slot_count][self.alive[:self.slot_count]]
+
+    def add_triangle(self, a, b, c):
+        if self.free_slots:
+            slot = self.free_slots.pop()
+        else:
+            if self.slot_count == self.capacity:
+                self.allocate(self.capacity + 1)
+
+            slot = self.slot_count
+            self.slot_count += 1
+
+        self.triangles[slot] = (a, b, c)
+        self.alive[slot] = True
+
+        for vertex in (a, b, c):
+            self.star(vertex).add(slot)
+
+        self.dirty_slots.add(slot)
+
+    def remove_triangle(self, slot):
+        self.alive[slot] = False
+
+        for vertex in self.triangles[slot].tolist():
+            self.star(vertex).discard(slot)
+
+        self.free_slots.append(slot)
+        self.dirty_slots.add(slot)
+
+    def neighbour(self, slot, a, b):
+        others = (self.star(a) & self.star(b)) - {slot}
+        return next(iter(others), None)
+
+    def insert(self, vertex):
+        points = self.sites.points
+        p = points[vertex]
+
+        # the closest other site always becomes a neighbour of the new one, so the cavity touches its star
+        _, nearest = self.sites.query(p, 2)
+        nearest = [index for index in nearest.tolist() if index != vertex]
+        if not nearest:
+            return False
+
+        def circumscribes(slot):
+            a, b, c = self.triangles[slot]
+            return in_circumcircle(points[a], points[b], points[c], p)
+
+        stack = [slot for slot in self.star(nearest[0]) if circumscribes(slot)]
+        cavity = set()
+
+        while stack:
+            slot = stack.pop()
+            if slot in cavity:
+                continue
+
+            cavity.add(slot)
+            a, b, c = self.triangles[slot].tolist()
+
+            for edge in ((a, b), (b, c), (c, a)):
+                other = self.neighbour(slot, *edge)
+                if other is not None and other not in cavity and circumscribes(other):
+                    stack.append(other)
+
+        # a point outside of the hull is in no triangle, the hull would have to grow
+        if not any(min(orientation(points[a], points[b], p), orientation(points[b], points[c], p), orientation(points[c], points[a], p)) >= 0 for a, b, c in (self.triangles[slot].tolist() for slot in cavity)):
+            return False
+
+        boundary = []
+        for slot in cavity:
+            a, b, c = self.triangles[slot].tolist()
+
+            for edge in ((a, b), (b, c), (c, a)):
+                if self.neighbour(slot, *edge) not in cavity:
+                    boundary.append(edge)
+
+        # rounding can make the cavity not star shaped around the point, that would give flipped triangles
+        if any(orientation(points[a], points[b], p) <= 0 for a, b in boundary):
+            return False
+
+        for slot in cavity:
+            self.remove_triangle(slot)
+
+        for a, b in boundary:
+            self.add_triangle(a, b, vertex)
+
+        return True
+
+    def remove(self, vertex):
+        points = self.sites.points
+        star = list(self.star(vertex))
+
+        # the edges opposite to the vertex have to form one closed loop, they do not for a vertex on the hull
+        link = {}
+        for slot in star:
+            a, b, c = self.triangles[slot].tolist()
+            start, end = (b, c) if a == vertex else (c, a) if b == vertex else (a, b)
+            link[start] = end
+
+        if len(star) < 3 or len(link) != len(star) or set(link.values()) != set(link):
+            return False
+
+        polygon = [next(iter(link))]
+        while len(polygon) < len(link) and link[polygon[-1]] != polygon[0]:
+            polygon.append(link[polygon[-1]])
+
+        if len(polygon) != len(star) or link[polygon[-1]] != polygon[0]:
+            return False
+
+        # the triangles that fill the hole are the delaunay triangles of the loop that lie inside of it
+        if len(polygon) == 3:
+            hole_triangles = [polygon]
+        else:
+            try:
+                simplices = Delaunay(points[polygon]).simplices
+            except QhullError:
+                return False
+
+            star_triangles = [self.triangles[slot].tolist() for slot in star]
+            hole_triangles = []
+
+            for simplex in simplices.tolist():
+                triangle = [polygon[index] for index in simplex]
+                centroid = points[triangle].mean(axis=0)
+
+                if any(min(orientation(points[a], points[b], centroid), orientation(points[b], points[c], centroid), orientation(points[c], points[a], centroid)) > 0 for a, b, c in star_triangles):
+                    hole_triangles.append(triangle)
+
+            if len(hole_triangles) != len(star) - 2:
+                return False
+
+        for slot in star:
+            self.remove_triangle(slot)
+
+        for a, b, c in hole_triangles:
+            if orientation(points[a], points[b], points[c]) < 0:
+                b, c = c, b
+
+            self.add_triangle(a, b, c)
+
+        return True
+
+    def add(self, position):
+        vertex = self.sites.add(position)
+
+        return self.insert(vertex)
+
+    def move(self, vertex, position):
+        removed = self.remove(vertex)
+        self.sites.move(vertex, position)
+
+        return removed and self.insert(vertex)
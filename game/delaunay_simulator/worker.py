@@ -0,0 +1,59 @@
+import threading, logging, time
+
+from game.delaunay_simulator.triangulation import IncrementalDelaunay
+
+class TriangulationWorker():
+    # full triangulations run on a thread, qhull releases the GIL so the frames keep going meanwhile.
+    # there is only one request slot, a newer point set replaces a request that has not been started yet
+    def __init__(self):
+        self.condition = threading.Condition()
+
+        self.pending = None
+        self.result = None
+        self.running = True
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def request(self, points, generation):
+        with self.condition:
+            self.pending = (points.copy(), generation)
+            self.condition.notify()
+
+    def take_result(self):
+        # the newest finished triangulation as (triangulation, generation, seconds) or None, the triangulation is None when it failed
+        with self.condition:
+            result, self.result = self.result, None
+
+        return result
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.running and self.pending is None:
+                    self.condition.wait()
+
+                if not self.running:
+                    return
+
+                (points, generation), self.pending = self.pending, None
+
+            start = time.perf_counter()
+
+            try:
+                triangulation = IncrementalDelaunay(points)
+            except Exception:
+                logging.exception(f"Triangulating {len(points)} points failed.")
+                triangulation = None
+
+            elapsed = time.perf_counter() - start
+
+            with self.condition:
+                self.result = (triangulation, generation, elapsed)
+
+    def close(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+
+        self.thread.join()
@@ -0,0 +1,45 @@
+import numpy as np
+
+def shifted_frequencies(size):
+    # the frequency of every coefficient of an fftshifted spectrum, from -size // 2 up
+    return np.fft.fftshift(np.fft.fftfreq(size, 1 / size)).round().astype(np.int64)
+
+def path_table(coefficients, frequencies, size):
+    # the sum of all epicycles at size evenly spaced times in one inverse FFT, every frequency lands on its own bin
+    spectrum = np.zeros(size, dtype=np.complex128)
+    np.add.at(spectrum, frequencies % size, coefficients)
+
+    return np.fft.ifft(spectrum) * size
+
+def sample_table(table, t):
+    # linear interpolation between the two samples around t, t is in whole turns and wraps around
+    position = (t % 1.0) * len(table)
+    index = int(position) % len(table)
+    fraction = position - int(position)
+
+    point = table[index] + (table[(index + 1) % len(table)] - table[index]) * fraction
+
+    return float(point.real), float(point.imag)
+
+def largest_coefficients(coefficients, count):
+    # the indices of the count coefficients with the largest magnitude, in frequency order
+    order = np.argsort(-np.abs(coefficients), kind="stable")
+
+    return np.sort(order[:count])
+
+def energy_coefficients(coefficients, frequencies, fraction):
+    # the fewest coefficients, counted from the largest, whose share of the energy reaches fraction.
+    # the constant term only places the drawing and would make up most of the energy, so it is always kept and not counted
+    energy = np.where(frequencies == 0, 0, np.abs(coefficients) ** 2)
+    order = np.argsort(-energy, kind="stable")
+
+    cumulative = np.cumsum(energy[order])
+    count = int(np.searchsorted(cumulative, fraction * cumulative[-1])) + 1
+
+    return np.union1d(order[:min(count, len(order))], np.flatnonzero(frequencies == 0))
+
+def reconstruction_error(table, samples, width, height):
+    # the distance in pixels between the reconstructed and the resampled path at every sample, as rms and max
+    difference = np.abs((table.real - samples.real) * width + 1j * (table.imag - samples.imag) * height)
+
+    return float(np.sqrt(np.mean(difference ** 2))), float(difference.max())
@@ -1,7 +1,11 @@
 import arcade, arcade.gui, os, json, numpy as np
 
+from utils.constants import button_style
+from utils.preload import button_texture, button_hovered_texture
+
 from scipy.interpolate import interp1d
 
+from game.fourier_simulator.epicycles import shifted_frequencies, path_table, sample_table, largest_coefficients, energy_coefficients, reconstruction_error
 from game.base import BaseGame
 
 class Game(BaseGame):
@@ -10,16 +14,25 @@ class Game(BaseGame):
                 "max_coefficients": 1000,
                 "speed": 1.0,
                 "tail_size": 1000,
-                "resampling_size": 512
+                "resampling_size": 512,
+                "truncation": "First",
+                "energy_fraction": 99.9
         })
 
+        self.settings["fourier_simulator"].setdefault("truncation", "First")
+        self.settings["fourier_simulator"].setdefault("energy_fraction", 99.9)
+
         self.path_points = []
         
         self.drawing_done = False
         
         self.fourier_coefficients = []
+        self.fourier_frequencies = []
         self.drawing_trail = []
 
+        # the drawn path at every resampled time, rebuilt only when the coefficients change
+        self.path_table = None
+
         self.time = 0.0
 
     def on_show_view(self):
@@ -29,6 +42,34 @@ class Game(BaseGame):
         self.add_setting("Speed: {value}", 0.1, 1.5, 0.1, "speed")
         self.add_setting("Tail Size: {value}", 10, 1000, 10, "tail_size")
         self.add_setting("Resampling Size: {value}", 128, 8192, 128, "resampling_size")
+        self.add_setting("Energy Fraction: {value}%", 90, 99.99, 0.01, "energy_fraction")
+
+        self.truncation_button = self.settings_box.add(arcade.gui.UITextureButton(text=f"Keep: {self.settings['fourier_simulator']['truncation']}", texture=button_texture, texture_hovered=button_hovered_texture, width=self.window.width * 0.2, style=button_style))
+        self.truncation_button.on_click = lambda event: self.switch_truncation()
+
+        self.fidelity_label = self.settings_box.add(arcade.gui.UILabel(text="Coefficients: 0 of 0\nRMS error: 0.00 px\nMax error: 0.00 px", multiline=True, width=self.window.width * 0.19, size_hint=(0.95, 0)))
+
+    def switch_truncation(self):
+        # first keeps the lowest frequencies, largest the max_coefficients biggest ones and energy as many as the energy fraction needs
+        modes = ["First", "Largest", "Energy"]
+        current_settings = self.settings["fourier_simulator"]
+
+        current_settings["truncation"] = modes[(modes.index(current_settings["truncation"]) + 1) % len(modes)]
+        self.truncation_button.text = f"Keep: {current_settings['truncation']}"
+
+        self.recalculate()
+
+    def change_value(self, label, text, settings_key, value):
+        super().change_value(label, text, settings_key, value)
+
+        # speed and tail size only change the playback, the coefficients and the trail stay
+        if settings_key in ("max_coefficients", "resampling_size", "energy_fraction"):
+            self.recalculate()
+
+    def recalculate(self):
+        if self.drawing_done:
+            self.drawing_trail.clear()
+            self.calculate_fourier_coefficients()
 
     def on_mouse_press(self, x, y, button, modifiers):
         self.path_points = []
@@ -40,14 +81,7 @@ class Game(BaseGame):
         self.calculate_fourier_coefficients()
 
     def calculate_drawing_point(self, t):
-        pos = 0j
-        
-        for i, c in enumerate(self.fourier_coefficients):
-            k = i - (len(self.fourier_coefficients) // 2)
-            angle = 2 * np.pi * k * t
-            pos += c * np.exp(1j * angle)
-
-        return float(pos.real), float(pos.imag)
+        return sample_table(self.path_table, t)
     
     def resample_path(self, path_points, N):
         t = np.linspace(0, 1, len(path_points))
@@ -68,8 +102,26 @@ class Game(BaseGame):
         c_points = self.resample_path(c_points, int(self.settings["fourier_simulator"]["resampling_size"]))
 
         coeffs = np.fft.fftshift(np.fft.fft(c_points) / len(c_points))
+        frequencies = shifted_frequencies(len(c_points))
+
+        current_settings = self.settings["fourier_simulator"]
+        max_coefficients = int(current_settings["max_coefficients"])
 
-        self.fourier_coefficients = np.array(coeffs[:int(self.settings["fourier_simulator"]["max_coefficients"])], dtype=np.complex64)
+        if current_settings["truncation"] == "Largest":
+            kept = largest_coefficients(coeffs, max_coefficients)
+        elif current_settings["truncation"] == "Energy":
+            kept = energy_coefficients(coeffs, frequencies, current_settings["energy_fraction"] / 100)
+        else:
+            kept = np.arange(min(max_coefficients, len(coeffs)))
+
+        self.fourier_coefficients = np.array(coeffs[kept], dtype=np.complex64)
+        self.fourier_frequencies = frequencies[kept]
+
+        self.path_table = path_table(self.fourier_coefficients, self.fourier_frequencies, len(c_points))
+
+        # the table holds the reconstruction at the resampled times, so it is compared with the resampled path point by point
+        rms_error, max_error = reconstruction_error(self.path_table, c_points, self.window.width, self.window.height)
+        self.fidelity_label.text = f"Coefficients: {len(kept)} of {len(coeffs)}\nRMS error: {rms_error:.2f} px\nMax error: {max_error:.2f} px"
     
     def on_mouse_drag(self, x, y, dx, dy, _buttons, _modifiers):
         if not self.drawing_done:
@@ -78,7 +130,7 @@ class Game(BaseGame):
     def on_update(self, delta_time):
         self.time += delta_time
 
-        if self.drawing_done:
+        if self.drawing_done and self.path_table is not None:
             t_normalized = (self.time * self.settings["fourier_simulator"]["speed"]) % 1.0
             x, y = self.calculate_drawing_point(t_normalized)
 
@@ -0,0 +1,79 @@
+import pyglet.gl, ctypes, logging
+
+from collections import deque
+from contextlib import contextmanager
+
+from pyglet.gl import GL_TIMESTAMP, GL_QUERY_COUNTER_BITS, GL_QUERY_RESULT, GL_QUERY_RESULT_AVAILABLE
+
+class GPUTimer():
+    def __init__(self, profiler, max_pending=64):
+        self.profiler = profiler
+        self.max_pending = max_pending
+
+        self.free_queries = []
+        self.pending = deque()
+
+        # timestamp queries are core since GL 3.3, but a driver can still report a zero bit counter (no timer available)
+        counter_bits = ctypes.c_int(0)
+        pyglet.gl.glGetQueryiv(GL_TIMESTAMP, GL_QUERY_COUNTER_BITS, ctypes.byref(counter_bits))
+        self.supported = counter_bits.value > 0
+
+        if not self.supported:
+            logging.warning("GL driver has no timestamp counter, GPU timings are disabled.")
+
+    def create_query(self):
+        if self.free_queries:
+            return self.free_queries.pop()
+
+        query = pyglet.gl.GLuint(0)
+        pyglet.gl.glGenQueries(1, ctypes.byref(query))
+        return query.value
+
+    @contextmanager
+    def section(self, name, on_result=None):
+        # timestamps instead of GL_TIME_ELAPSED so sections can nest, and when too many results are still in flight the section is skipped instead of growing the queue
+        if not self.supported or len(self.pending) >= self.max_pending:
+            yield
+            return
+
+        start_query, end_query = self.create_query(), self.create_query()
+        pyglet.gl.glQueryCounter(start_query, GL_TIMESTAMP)
+
+        try:
+            yield
+        finally:
+            pyglet.gl.glQueryCounter(end_query, GL_TIMESTAMP)
+            self.pending.append((name, start_query, end_query, on_result))
+
+    def poll(self):
+        # results arrive in submission order, so only the oldest pending pair needs checking and nothing here waits on the GPU
+        available = ctypes.c_int(0)
+        start_time, end_time = pyglet.gl.GLuint64(0), pyglet.gl.GLuint64(0)
+
+        while self.pending:
+            name, start_query, end_query, on_result = self.pending[0]
+
+            pyglet.gl.glGetQueryObjectiv(end_query, GL_QUERY_RESULT_AVAILABLE, ctypes.byref(available))
+            if not available.value:
+                break
+
+            self.pending.popleft()
+
+            pyglet.gl.glGetQueryObjectui64v(start_query, GL_QUERY_RESULT, ctypes.byref(start_time))
+            pyglet.gl.glGetQueryObjectui64v(end_query, GL_QUERY_RESULT, ctypes.byref(end_time))
+
+            elapsed = (end_time.value - start_time.value) / 1e9
+            self.profiler.record(f"GPU {name}", elapsed)
+            self.free_queries.extend([start_query, end_query])
+
+            if on_result is not None:
+                on_result(elapsed)
+
+    def delete(self):
+        queries = self.free_queries + [query for _, start_query, end_query, _ in self.pending for query in (start_query, end_query)]
+
+        if queries:
+            pyglet.gl.glDeleteQueries(len(queries), (pyglet.gl.GLuint * len(queries))(*queries))
+
+        self.free_queries = []
+        self.pending.clear()
@@ -30,6 +30,7 @@ class Game(BaseGame):
 
         self.add_setting("Thickness: {value}", 0.001, 0.05, 0.001, "thickness")
         self.add_setting("Samples: {value}", 1, 1000, 25, "samples")
+        self.add_gpu_timings_label()
 
         self.setup()
 
@@ -58,7 +59,8 @@ class Game(BaseGame):
 
             self.shader_program["time"] = self.time
 
-            self.shader_program.dispatch(int(self.lissajous_image.width / 32), int(self.lissajous_image.height / 32), 1)
+            with self.gpu_section("Lissajous"):
+                self.shader_program.dispatch(int(self.lissajous_image.width / 32), int(self.lissajous_image.height / 32), 1)
     
     def on_key_press(self, symbol, modifiers):
         if symbol == arcade.key.ESCAPE: # overwrite and no super because shader program needs to be deleted.
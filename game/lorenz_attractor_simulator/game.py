@@ -1,8 +1,15 @@
-import pyglet, arcade, arcade.gui, os, json, time
+import pyglet, arcade, arcade.gui, math, os, json, time
 
-from game.lorenz_attractor_simulator.shader import create_shader
+from game.lorenz_attractor_simulator.shader import create_shader, create_density_buffer, clear_density_buffer, create_display, create_particle_buffer
+from game.lorenz_attractor_simulator.scheduler import FrameBudgetScheduler
 from game.base import BaseGame
 
+from utils.constants import button_style
+from utils.preload import button_texture, button_hovered_texture
+
+# without GPU results the frame time steers the work, against a bit more than a 60 Hz frame so vsync alone never shrinks it
+CPU_FRAME_BUDGET_MS = 1000 / 60 * 1.1
+
 class Game(BaseGame):
     def __init__(self, pypresence_client):
         super().__init__(pypresence_client, "Lorenz Attractor Simulator", "lorenz_attractor_simulator", {
@@ -11,68 +18,215 @@ class Game(BaseGame):
                 "beta": 2.66666666,
                 "steps": 50,
                 "decay_factor": 0.999,
-                "speed": 1 
+                "speed": 1,
+                "mode": "Particles",
+                "particle_count": 65536,
+                "display_format": "RGBA8",
+                "frame_budget": 8
         })
 
+        self.settings["lorenz_attractor_simulator"].setdefault("mode", "Particles")
+        self.settings["lorenz_attractor_simulator"].setdefault("particle_count", 65536)
+        self.settings["lorenz_attractor_simulator"].setdefault("display_format", "RGBA8")
+        self.settings["lorenz_attractor_simulator"].setdefault("frame_budget", 8)
+
         self.delta_time = 0
         self.should_clear = False
 
-        self.last_update = time.perf_counter()
+        # the GPU time of the Lorenz passes is held at the budget by changing the steps per particle, or the rows of seeds per frame
+        budget = self.settings["lorenz_attractor_simulator"]["frame_budget"]
+        self.band_count = math.ceil(self.window.height / 32)
+        self.band_offset = 0
+
+        self.particle_scheduler = FrameBudgetScheduler(budget, 1, int(self.settings["lorenz_attractor_simulator"]["steps"]), 8)
+        self.seed_scheduler = FrameBudgetScheduler(budget, 1, self.band_count, 1)
+
+        self.last_scheduled = None
 
     def setup(self):
-        self.shader_program, self.lorenz_image = create_shader(int(self.window.width * 0.8), self.window.height)
+        self.shader_program, self.particle_program = create_shader()
+        self.density_ssbo = create_density_buffer(int(self.window.width * 0.8), self.window.height)
+
+        self.particle_count = int(self.settings["lorenz_attractor_simulator"]["particle_count"])
+        self.particles_ssbo = create_particle_buffer(self.particle_count)
+        self.frame = 0
+
+        self.setup_display()
+
+    def setup_display(self):
+        self.tonemap_program, self.lorenz_image = create_display(int(self.window.width * 0.8), self.window.height, self.settings["lorenz_attractor_simulator"]["display_format"])
 
         self.image_sprite = pyglet.sprite.Sprite(self.lorenz_image)
 
+    def delete_display(self):
+        self.image_sprite.delete()
+        self.lorenz_image.delete()
+        self.tonemap_program.delete()
+
     def on_show_view(self):
         super().on_show_view()
 
         self.add_setting("Sigma: {value}", 1, 50, 0.1, "sigma")
         self.add_setting("Rho: {value}", 1, 100, 0.1, "rho")
         self.add_setting("Beta: {value}", 0.1, 10, 0.01, "beta")
-        self.add_setting("Steps: {value}", 50, 1000, 10, "steps")
+        self.add_setting("Max Steps: {value}", 50, 1000, 10, "steps")
         self.add_setting("Decay multiplier: {value}", 0.8, 1, 0.001, "decay_factor")
         self.add_setting("Speed: {value}", 0.1, 100, 0.1, "speed")
+        self.add_setting("Particles: {value}", 16384, 1048576, 16384, "particle_count")
+        self.add_setting("GPU Budget: {value} ms", 1, 33, 1, "frame_budget")
+
+        self.mode_button = self.settings_box.add(arcade.gui.UITextureButton(text=f"Mode: {self.settings['lorenz_attractor_simulator']['mode']}", texture=button_texture, texture_hovered=button_hovered_texture, width=self.window.width * 0.2, style=button_style))
+        self.mode_button.on_click = lambda event: self.switch_mode()
+
+        self.display_format_button = self.settings_box.add(arcade.gui.UITextureButton(text=f"Display: {self.settings['lorenz_attractor_simulator']['display_format']}", texture=button_texture, texture_hovered=button_hovered_texture, width=self.window.width * 0.2, style=button_style))
+        self.display_format_button.on_click = lambda event: self.switch_display_format()
+
+        self.scheduler_label = self.settings_box.add(arcade.gui.UILabel(text="Work per frame: 0 of 0 row bands\n(unmeasured)", multiline=True, width=self.window.width * 0.19))
+        self.add_gpu_timings_label()
 
         self.setup()
 
     def change_value(self, label, text, settings_key, value):
         super().change_value(label, text, settings_key, value)
 
+        if settings_key == "frame_budget":
+            self.particle_scheduler.budget_ms = self.seed_scheduler.budget_ms = value
+            return
+
+        if settings_key == "steps":
+            self.particle_scheduler.set_limits(1, int(value))
+
+        self.should_clear = True
+
+    def switch_mode(self):
+        current_settings = self.settings["lorenz_attractor_simulator"]
+
+        current_settings["mode"] = "Seeds" if current_settings["mode"] == "Particles" else "Particles"
+        self.mode_button.text = f"Mode: {current_settings['mode']}"
+
         self.should_clear = True
 
+    def switch_display_format(self):
+        current_settings = self.settings["lorenz_attractor_simulator"]
+
+        # only the display texture changes, the density keeps accumulating
+        current_settings["display_format"] = "RGBA32F" if current_settings["display_format"] == "RGBA8" else "RGBA8"
+        self.display_format_button.text = f"Display: {current_settings['display_format']}"
+
+        self.delete_display()
+        self.setup_display()
+
+    def tonemap(self, current_settings, decay_factor):
+        resolution = (int(self.window.width * 0.8), self.window.height)
+
+        with self.tonemap_program:
+            self.tonemap_program["resolution"] = resolution
+            self.tonemap_program["decay_factor"] = decay_factor
+
+            with self.gpu_section("Lorenz tonemap"):
+                self.tonemap_program.dispatch(math.ceil(resolution[0] / 32), math.ceil(resolution[1] / 32), 1, barrier=pyglet.gl.GL_TEXTURE_FETCH_BARRIER_BIT | pyglet.gl.GL_SHADER_STORAGE_BARRIER_BIT)
+
+    def reseed_particles(self):
+        self.particles_ssbo.delete()
+
+        self.particle_count = int(self.settings["lorenz_attractor_simulator"]["particle_count"])
+        self.particles_ssbo = create_particle_buffer(self.particle_count)
+
+    def update_particles(self, current_settings):
+        resolution = (int(self.window.width * 0.8), self.window.height)
+
+        with self.particle_program:
+            self.particle_program["sigma"] = current_settings["sigma"]
+            self.particle_program["rho"] = current_settings["rho"]
+            self.particle_program["beta"] = current_settings["beta"]
+            self.particle_program["steps"] = self.particle_scheduler.next_work()
+            # explicit euler blows up past this, the particles would only be reseeded every step
+            self.particle_program["dt"] = min(current_settings["speed"] * 0.001, 0.01)
+            self.particle_program["resolution"] = resolution
+            self.particle_program["particle_count"] = self.particle_count
+            self.particle_program["frame"] = self.frame
+
+            with self.gpu_section("Lorenz particles"):
+                self.particle_program.dispatch(math.ceil(self.particle_count / 256), 1, 1, barrier=pyglet.gl.GL_SHADER_STORAGE_BARRIER_BIT)
+
+        self.frame += 1
+
+    def update_seeds(self, current_settings, band_count):
+        # progressive: a band of rows per frame, and the image keeps refining band by band while nothing changes
+        with self.shader_program:
+            self.shader_program["sigma"] = current_settings["sigma"]
+            self.shader_program["rho"] = current_settings["rho"]
+            self.shader_program["beta"] = current_settings["beta"]
+            self.shader_program["steps"] = int(current_settings["steps"])
+            self.shader_program["dt"] = self.delta_time
+            self.shader_program["resolution"] = (int(self.window.width * 0.8), self.window.height)
+            self.shader_program["row_offset"] = self.band_offset * 32
+
+            with self.gpu_section("Lorenz integrate"):
+                self.shader_program.dispatch(math.ceil(int(self.window.width * 0.8) / 32), band_count, 1, barrier=pyglet.gl.GL_SHADER_STORAGE_BARRIER_BIT)
+
+        self.band_offset = (self.band_offset + band_count) % self.band_count
+        self.delta_time += current_settings["speed"] * 0.00005 * band_count / self.band_count
+
+    def update_scheduler_label(self, mode):
+        if not self.profiler.refresh_due("Scheduler"):
+            return
+
+        if mode == "Particles":
+            scheduler, text = self.particle_scheduler, f"Work per frame: {self.particle_scheduler.next_work()} steps per particle"
+        else:
+            scheduler, text = self.seed_scheduler, f"Work per frame: {self.seed_scheduler.next_work()} of {self.band_count} row bands"
+
+        sources = {None: "unmeasured", "GPU": "GPU timed", "CPU": "CPU frame time"}
+        self.scheduler_label.text = f"{text}\n({sources[scheduler.source]})"
+
     def on_update(self, delta_time):
-        if time.perf_counter() - self.last_update >= 1 / 15:
-            if self.should_clear:
-                self.should_clear = False
-                self.delta_time = 0
+        if self.should_clear:
+            self.should_clear = False
+            self.delta_time = 0
+            self.band_offset = 0
+
+            clear_density_buffer(self.density_ssbo)
+
+            if self.settings["lorenz_attractor_simulator"]["mode"] == "Particles":
+                self.reseed_particles()
+
+        current_settings = self.settings["lorenz_attractor_simulator"]
 
-                pyglet.gl.glClearTexImage(
-                    self.lorenz_image.id, 0, 
-                    pyglet.gl.GL_RGBA, pyglet.gl.GL_FLOAT, 
-                    None
-                )
+        if current_settings["mode"] == "Particles":
+            scheduler, work = self.particle_scheduler, self.particle_scheduler.work
+        else:
+            scheduler, work = self.seed_scheduler, min(self.seed_scheduler.work, self.band_count - self.band_offset)
 
-            current_settings = self.settings["lorenz_attractor_simulator"]
+        # no GPU result in a while means the timestamps are unsupported or too many are in flight, the last frame's time is used then
+        if self.last_scheduled is None or self.last_scheduled[0] is not scheduler:
+            scheduler.last_gpu_result = time.perf_counter()
+        elif scheduler.gpu_result_age() > 0.5:
+            scheduler.record(self.last_scheduled[1], delta_time, "CPU", CPU_FRAME_BUDGET_MS)
 
-            with self.shader_program:
-                self.shader_program["sigma"] = current_settings["sigma"]
-                self.shader_program["rho"] = current_settings["rho"]
-                self.shader_program["beta"] = current_settings["beta"]
-                self.shader_program["steps"] = int(current_settings["steps"])
-                self.shader_program["dt"] = self.delta_time
-                self.shader_program["resolution"] = (int(self.window.width * 0.8), self.window.height)
-                self.shader_program["decay_factor"] = current_settings["decay_factor"]
+        self.last_scheduled = (scheduler, work)
 
-                self.shader_program.dispatch(int(self.window.width * 0.8) // 32, self.window.height // 32)
+        # the whole frame is timed, so fixed costs like the tone-mapping count against the budget too
+        with self.gpu_section("Lorenz frame", scheduler.result_callback(work)):
+            if current_settings["mode"] == "Particles":
+                self.update_particles(current_settings)
+                self.tonemap(current_settings, current_settings["decay_factor"])
+            else:
+                band_count = max(int(work), 1)
+                self.update_seeds(current_settings, band_count)
 
-                pyglet.gl.glMemoryBarrier(pyglet.gl.GL_SHADER_IMAGE_ACCESS_BARRIER_BIT)
+                # the decay multiplier is per sweep over all bands, so the image fades the same however many bands a frame gets
+                self.tonemap(current_settings, current_settings["decay_factor"] ** (band_count / self.band_count))
 
-            self.delta_time += (current_settings["speed"] * 0.00005)
+        self.update_scheduler_label(current_settings["mode"])
 
     def on_key_press(self, symbol, modifiers):
         if symbol == arcade.key.ESCAPE: # overwrite instead of super because deleting shader program is mandatory.
             self.shader_program.delete()
+            self.particle_program.delete()
+            self.particles_ssbo.delete()
+            self.density_ssbo.delete()
+            self.delete_display()
 
             with open("data.json", "w") as file:
                 file.write(json.dumps(self.settings, indent=4))
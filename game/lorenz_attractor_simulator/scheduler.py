@@ -0,0 +1,36 @@
+import time
+
+class FrameBudgetScheduler():
+    def __init__(self, budget_ms, min_work, max_work, work):
+        self.budget_ms = budget_ms
+        self.min_work, self.max_work = min_work, max_work
+
+        # the work is kept fractional, so growing by small factors is not lost to rounding
+        self.work = min(max(work, min_work), max_work)
+
+        # where the last timing came from, None until the first one arrives
+        self.source = None
+        self.last_gpu_result = time.perf_counter()
+
+    def set_limits(self, min_work, max_work):
+        self.min_work, self.max_work = min_work, max_work
+        self.work = min(max(self.work, min_work), max_work)
+
+    def next_work(self):
+        return max(int(self.work), self.min_work)
+
+    def record(self, work, seconds, source="GPU", budget_ms=None):
+        # timings arrive a few frames late, so the step starts from the work that was measured and not the current one.
+        # shrinking is faster than growing, and a single noisy sample can not swing the work far either way
+        ratio = (budget_ms or self.budget_ms) / max(seconds * 1000, 1e-3)
+        self.work = min(max(work * min(max(ratio, 0.5), 1.25), self.min_work), self.max_work)
+
+        self.source = source
+        if source == "GPU":
+            self.last_gpu_result = time.perf_counter()
+
+    def gpu_result_age(self):
+        return time.perf_counter() - self.last_gpu_result
+
+    def result_callback(self, work):
+        return lambda seconds: self.record(work, seconds)
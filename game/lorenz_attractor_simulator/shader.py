@@ -1,8 +1,17 @@
-import pyglet, pyglet.graphics
+import pyglet, pyglet.graphics, numpy as np
 
-from pyglet.gl import GL_NEAREST
+from pyglet.gl import GL_NEAREST, glBindBufferBase, GL_SHADER_STORAGE_BUFFER
 
-shader_source = """#version 430 core
+# hits are stored in fixed point so the decay can remove fractions of a hit
+DENSITY_SCALE = 256
+
+# GL internal format and the matching image layout qualifier of the display texture
+display_formats = {
+    "RGBA8": (pyglet.gl.GL_RGBA8, "rgba8"),
+    "RGBA32F": (pyglet.gl.GL_RGBA32F, "rgba32f")
+}
+
+shader_source = f"""#version 430 core
 uniform vec2 resolution;
 
 uniform float sigma;
@@ -10,66 +19,199 @@ uniform float rho;
 uniform float beta;
 uniform float dt;
 uniform int steps;
-uniform float decay_factor;
+uniform int row_offset;
+
+layout (std430, binding = 4) buffer Density {{
+    uint density[];
+}};
 
 layout (local_size_x = 32, local_size_y = 32, local_size_z = 1) in;
-layout (location = 0, rgba32f) uniform image2D img_output;
 
-vec2 project (vec3 p) {
+vec2 project (vec3 p) {{
     return (vec2(p.x + 25, p.z) * 0.02);
-}
+}}
 
-void main() {
-    ivec2 texel_coord = ivec2(gl_GlobalInvocationID.xy);
+void main() {{
+    // the scheduler only dispatches a band of rows per frame, starting at row_offset
+    ivec2 texel_coord = ivec2(gl_GlobalInvocationID.xy) + ivec2(0, row_offset);
 
-    if (texel_coord.x >= int(resolution.x) || texel_coord.y >= int(resolution.y)) {
+    if (texel_coord.x >= int(resolution.x) || texel_coord.y >= int(resolution.y)) {{
         return;
-    }
-
-    vec4 current_color = imageLoad(img_output, texel_coord);
-    current_color.rgb *= decay_factor;
-    imageStore(img_output, texel_coord, current_color);
+    }}
 
-    for (int seed_offset = 0; seed_offset < 4; seed_offset++) {
+    for (int seed_offset = 0; seed_offset < 4; seed_offset++) {{
         float seedx = (float(texel_coord.x + seed_offset * 0.25) / resolution.x - 0.5) * 20.0;
         float seedy = (float(texel_coord.y + seed_offset * 0.25) / resolution.y - 0.5) * 20.0;
         float seedz = 15.0 + seed_offset * 2.0;
 
         vec3 p = vec3(seedx, seedy, seedz);
 
-        for (int i = 0; i < steps; i++) {
+        for (int i = 0; i < steps; i++) {{
             float dx = sigma * (p.y - p.x);
             float dy = p.x * (rho - p.z) - p.y;
             float dz = p.x * p.y - beta * p.z;
-            
+
             p += vec3(dx, dy, dz) * dt;
 
             vec2 uv = project(p);
             ivec2 coord = ivec2(uv * resolution);
 
             if (coord.x >= 0 && coord.x < int(resolution.x) &&
-                coord.y >= 0 && coord.y < int(resolution.y)) {
+                coord.y >= 0 && coord.y < int(resolution.y)) {{
+
+                atomicAdd(density[coord.y * int(resolution.x) + coord.x], {DENSITY_SCALE}u);
+            }}
+        }}
+    }}
+}}
 
-                vec4 old_color = imageLoad(img_output, coord);
-                float intensity = 0.008;
+"""
 
-                vec3 new_color = old_color.rgb + vec3(intensity, intensity * 0.6, intensity * 0.9);
-                new_color = min(new_color, vec3(1.0));
-                imageStore(img_output, coord, vec4(new_color, 1.0));
+particle_shader_source = f"""#version 430 core
 
-            }
-        }
-    }
-}
+// xyz is the position of every particle, it persists between frames
+layout (std430, binding = 3) buffer Particles {{
+    vec4 particles[];
+}};
+
+layout (std430, binding = 4) buffer Density {{
+    uint density[];
+}};
+
+uniform vec2 resolution;
+
+uniform float sigma;
+uniform float rho;
+uniform float beta;
+uniform float dt;
+uniform int steps;
+uniform int particle_count;
+uniform int frame;
+
+layout (local_size_x = 256, local_size_y = 1, local_size_z = 1) in;
+
+vec2 project (vec3 p) {{
+    return (vec2(p.x + 25, p.z) * 0.02);
+}}
+
+float hash(uint n) {{
+    n = (n << 13u) ^ n;
+    n = n * (n * n * 15731u + 789221u) + 1376312589u;
+    return float(n & 0x7fffffffu) / float(0x7fffffff);
+}}
+
+vec3 seed_particle(uint index) {{
+    // same seed box as the per texel seeds of the full mode
+    uint base = (index * 3u) ^ (uint(frame) * 2654435761u);
+    return vec3((hash(base) - 0.5) * 20.0, (hash(base + 1u) - 0.5) * 20.0, 15.0 + hash(base + 2u) * 6.0);
+}}
+
+void main() {{
+    uint index = gl_GlobalInvocationID.x;
+
+    if (index >= uint(particle_count)) {{
+        return;
+    }}
+
+    vec3 p = particles[index].xyz;
+
+    for (int i = 0; i < steps; i++) {{
+        float dx = sigma * (p.y - p.x);
+        float dy = p.x * (rho - p.z) - p.y;
+        float dz = p.x * p.y - beta * p.z;
 
+        p += vec3(dx, dy, dz) * dt;
+
+        vec2 uv = project(p);
+        ivec2 coord = ivec2(uv * resolution);
+
+        // only diverged particles and particles outside of the view start over
+        if (any(isnan(p)) || any(isinf(p)) || length(p) > 1000.0 ||
+            coord.x < 0 || coord.x >= int(resolution.x) ||
+            coord.y < 0 || coord.y >= int(resolution.y)) {{
+
+            p = seed_particle(index + uint(i) * uint(particle_count));
+            continue;
+        }}
+
+        // integer atomics never lose a hit and give the same sum in any order
+        atomicAdd(density[coord.y * int(resolution.x) + coord.x], {DENSITY_SCALE}u);
+    }}
+
+    particles[index] = vec4(p, 0.0);
+}}
 """
 
-def create_shader(width, height):
+tonemap_shader_source = f"""#version 430 core
+uniform vec2 resolution;
+uniform float decay_factor;
+
+layout (std430, binding = 4) buffer Density {{
+    uint density[];
+}};
+
+layout (local_size_x = 32, local_size_y = 32, local_size_z = 1) in;
+layout (location = 0, IMAGE_FORMAT) writeonly uniform image2D img_output;
+
+void main() {{
+    ivec2 texel_coord = ivec2(gl_GlobalInvocationID.xy);
+
+    if (texel_coord.x >= int(resolution.x) || texel_coord.y >= int(resolution.y)) {{
+        return;
+    }}
+
+    int index = texel_coord.y * int(resolution.x) + texel_coord.x;
+
+    // capped far past full brightness, so a frame of hits can never overflow the counter
+    float hits = float(min(density[index], {DENSITY_SCALE * 65536}u)) / {DENSITY_SCALE}.0;
+
+    // every hit used to add 0.008 in this tint, the exponential saturates smoothly instead of clamping
+    vec3 color = 1.0 - exp(-hits * 0.008 * vec3(1.0, 0.6, 0.9));
+    imageStore(img_output, texel_coord, vec4(color, 1.0));
+
+    density[index] = uint(hits * decay_factor * {DENSITY_SCALE}.0);
+}}
+"""
+
+def create_shader():
     shader_program = pyglet.graphics.shader.ComputeShaderProgram(shader_source)
+    particle_program = pyglet.graphics.shader.ComputeShaderProgram(particle_shader_source)
+
+    return shader_program, particle_program
+
+def create_density_buffer(width, height):
+    density_ssbo = pyglet.graphics.BufferObject(width * height * 4, usage=pyglet.gl.GL_DYNAMIC_COPY)
+    clear_density_buffer(density_ssbo)
+
+    glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 4, density_ssbo.id)
+
+    return density_ssbo
+
+def clear_density_buffer(density_ssbo):
+    pyglet.gl.glBindBuffer(GL_SHADER_STORAGE_BUFFER, density_ssbo.id)
+    pyglet.gl.glClearBufferData(GL_SHADER_STORAGE_BUFFER, pyglet.gl.GL_R32UI, pyglet.gl.GL_RED_INTEGER, pyglet.gl.GL_UNSIGNED_INT, None)
+
+def create_display(width, height, display_format):
+    internal_format, image_format = display_formats[display_format]
+
+    tonemap_program = pyglet.graphics.shader.ComputeShaderProgram(tonemap_shader_source.replace("IMAGE_FORMAT", image_format))
+
+    lorenz_attractor_image = pyglet.image.Texture.create(width, height, internalformat=internal_format, min_filter=GL_NEAREST, mag_filter=GL_NEAREST)
+
+    uniform_location = tonemap_program["img_output"]
+    lorenz_attractor_image.bind_image_texture(unit=uniform_location, access=pyglet.gl.GL_WRITE_ONLY, fmt=internal_format)
+
+    return tonemap_program, lorenz_attractor_image
+
+def create_particle_buffer(particle_count):
+    particles = np.zeros((particle_count, 4), dtype=np.float32)
+    particles[:, 0] = np.random.uniform(-10, 10, particle_count)
+    particles[:, 1] = np.random.uniform(-10, 10, particle_count)
+    particles[:, 2] = np.random.uniform(15, 21, particle_count)
 
-    lorenz_attractor_image = pyglet.image.Texture.create(width, height, internalformat=pyglet.gl.GL_RGBA32F, min_filter=GL_NEAREST, mag_filter=GL_NEAREST)
+    particles_ssbo = pyglet.graphics.BufferObject(particles.nbytes, usage=pyglet.gl.GL_DYNAMIC_COPY)
+    particles_ssbo.set_data(particles.tobytes())
 
-    uniform_location = shader_program["img_output"]
-    lorenz_attractor_image.bind_image_texture(unit=uniform_location)
+    glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 3, particles_ssbo.id)
 
-    return shader_program, lorenz_attractor_image
\ No newline at end of file
+    return particles_ssbo
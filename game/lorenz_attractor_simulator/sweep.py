@@ -0,0 +1,123 @@
+import argparse, itertools, json, time, os
+
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+
+# same tint as the tone-mapping shader
+TINT = np.array([1.0, 0.6, 0.9], dtype=np.float32)
+
+class LorenzIntegrator():
+    # the particle mode of shader.py on the CPU: explicit euler, the projection of project() and reseeding of diverged or out of view particles
+    def __init__(self, sigma, rho, beta, width, height, particle_count, seed=0):
+        self.sigma, self.rho, self.beta = sigma, rho, beta
+        self.width, self.height = width, height
+
+        self.rng = np.random.default_rng(seed)
+        self.positions = self.seed_particles(particle_count)
+        self.density = np.zeros(width * height, dtype=np.float64)
+
+    def seed_particles(self, count):
+        return np.column_stack([self.rng.uniform(-10, 10, count), self.rng.uniform(-10, 10, count), self.rng.uniform(15, 21, count)])
+
+    def step(self, dt, steps=1, accumulate=True):
+        x, y, z = self.positions.T
+
+        for _ in range(steps):
+            x, y, z = x + self.sigma * (y - x) * dt, y + (x * (self.rho - z) - y) * dt, z + (x * y - self.beta * z) * dt
+
+            with np.errstate(invalid="ignore"):
+                columns = np.floor((x + 25) * 0.02 * self.width)
+                rows = np.floor(z * 0.02 * self.height)
+
+                outside = ~np.isfinite(x + y + z) | (x * x + y * y + z * z > 1000.0 ** 2) | (columns < 0) | (columns >= self.width) | (rows < 0) | (rows >= self.height)
+
+            idx = np.flatnonzero(outside)
+            if len(idx):
+                x[idx], y[idx], z[idx] = self.seed_particles(len(idx)).T
+
+            if accumulate:
+                inside = ~outside
+                self.density += np.bincount((rows[inside] * self.width + columns[inside]).astype(np.int64), minlength=self.density.size)
+
+        self.positions = np.column_stack([x, y, z])
+
+    def image(self, brightness):
+        # the hit count of a still grows with the steps, so it is scaled by the 99th percentile of the lit pixels instead of a fixed exposure
+        lit = self.density[self.density > 0]
+        scale = brightness / np.percentile(lit, 99) if len(lit) else 0
+
+        color = 1.0 - np.exp(-self.density.reshape(self.height, self.width, 1) * scale * TINT)
+
+        # row 0 is the bottom of the view, like the GL texture
+        return Image.fromarray((np.flipud(color) * 255).astype(np.uint8), "RGB")
+
+def render_still(job):
+    start = time.perf_counter()
+
+    integrator = LorenzIntegrator(job["sigma"], job["rho"], job["beta"], job["width"], job["height"], job["particles"], job["seed"])
+    integrator.step(job["dt"], job["warmup"], accumulate=False)
+    integrator.step(job["dt"], job["steps"])
+    integrator.image(job["brightness"]).save(job["path"])
+
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Renders Lorenz attractor stills for every combination of the given parameters on the CPU and writes PNGs with a JSON manifest.")
+    parser.add_argument("--sigma", type=float, nargs="+", default=[10], help="sigma values of the grid")
+    parser.add_argument("--rho", type=float, nargs="+", default=[28], help="rho values of the grid")
+    parser.add_argument("--beta", type=float, nargs="+", default=[2.66666666], help="beta values of the grid")
+    parser.add_argument("--width", type=int, default=1536, help="width of every still")
+    parser.add_argument("--height", type=int, default=1080, help="height of every still")
+    parser.add_argument("--particles", type=int, default=65536, help="particles per still")
+    parser.add_argument("--steps", type=int, default=1000, help="accumulated steps per particle")
+    parser.add_argument("--warmup", type=int, default=200, help="unaccumulated steps before, so the seed box does not show up")
+    parser.add_argument("--dt", type=float, default=0.005, help="integration step")
+    parser.add_argument("--brightness", type=float, default=3.0, help="tone-mapping exposure relative to the brightest pixels")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the particle positions")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--output", default="lorenz_sweep", help="directory of the stills and manifest.json")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+
+    jobs = [
+        {
+            "sigma": sigma, "rho": rho, "beta": beta, "width": args.width, "height": args.height, "particles": args.particles,
+            "steps": args.steps, "warmup": args.warmup, "dt": args.dt, "brightness": args.brightness, "seed": args.seed,
+            "path": os.path.join(args.output, f"lorenz_{index:04d}.png")
+        }
+        for index, (sigma, rho, beta) in enumerate(itertools.product(args.sigma, args.rho, args.beta))
+    ]
+
+    start = time.perf_counter()
+
+    # the workers only need this module, so the pool is safe with both fork and spawn
+    with ProcessPoolExecutor(max_workers=min(args.workers, len(jobs))) as executor:
+        results = list(executor.map(render_still, jobs))
+
+    manifest = {
+        "width": args.width,
+        "height": args.height,
+        "particles": args.particles,
+        "steps": args.steps,
+        "warmup": args.warmup,
+        "dt": args.dt,
+        "brightness": args.brightness,
+        "seed": args.seed,
+        "workers": min(args.workers, len(jobs)),
+        "seconds": round(time.perf_counter() - start, 3),
+        "stills": [
+            {"file": os.path.basename(job["path"]), "sigma": job["sigma"], "rho": job["rho"], "beta": job["beta"], "seconds": round(elapsed, 3)}
+            for job, elapsed in zip(jobs, results)
+        ]
+    }
+
+    with open(os.path.join(args.output, "manifest.json"), "w") as file:
+        file.write(json.dumps(manifest, indent=4))
+
+    print(json.dumps(manifest, indent=4))
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-import arcade, arcade.gui, pymunk, pymunk.util, math, time, os, io, json
+import arcade, arcade.gui, pymunk, pymunk.util, math, os, io, json
 
 from PIL import Image
 
@@ -69,7 +69,6 @@ class Game(BaseGame):
 
         self.dragged_shape = None
         self.last_mouse_position = 0, 0
-        self.last_processing_time_update = time.perf_counter()
 
         self.iterations = self.settings["physics_playground"].get("iterations", 35)
         self.space.iterations = self.iterations
@@ -91,9 +90,7 @@ class Game(BaseGame):
         self.custom_mass = self.settings["physics_playground"].get("custom_mass", 1)
 
         self.info_box = self.anchor.add(arcade.gui.UIBoxLayout(space_between=3, align="left"), anchor_x="left", anchor_y="top")
-        self.fps_label = self.info_box.add(arcade.gui.UILabel(text="FPS: 60", text_color=arcade.color.BLACK))
         self.object_count_label = self.info_box.add(arcade.gui.UILabel(text="Object count: 0", text_color=arcade.color.BLACK))
-        self.processing_time_label = self.info_box.add(arcade.gui.UILabel(text="Processing time: 0 ms", text_color=arcade.color.BLACK))
 
         self.add_setting("Crate Elasticity: {value}", 0, 3, 0.1, "crate_elasticity", "elasticity", PhysicsCrate)
         self.add_setting("Coin Elasticity: {value}", 0, 3, 0.1, "coin_elasticity", "elasticity", PhysicsCoin)
@@ -390,8 +387,8 @@ class Game(BaseGame):
                         self.space.remove(shape)
                     self.space.remove(sprite.pymunk_obj.body)
 
-        start = time.perf_counter()
-        self.space.step(self.window._draw_rate)
+        with self.profile_section("Physics step"):
+            self.space.step(self.window._draw_rate)
 
         if self.dragged_shape is not None:
             self.dragged_shape.shape.body.position = self.last_mouse_position
@@ -403,11 +400,6 @@ class Game(BaseGame):
 
         self.object_count_label.text = f"Object count: {len(self.spritelist)}"
 
-        current_time = time.perf_counter()
-        if current_time - self.last_processing_time_update > 0.2: 
-            self.last_processing_time_update = current_time
-            self.processing_time_label.text = f"Processing time: {round((current_time - start) * 1000, 2)} ms"
-
     def on_key_press(self, symbol, modifiers):
         if symbol == arcade.key.ESCAPE: 
             arcade.set_background_color(menu_background_color)
@@ -0,0 +1,138 @@
+import numpy as np, argparse, math, json, os
+
+def uniform_points(rng, count, width, height):
+    return rng.random((count, 2)) * (width, height)
+
+def poisson_disc_points(rng, count, width, height, attempts=30):
+    # the distance is picked so a filled area holds more than count points, the extra ones are dropped at random
+    radius = math.sqrt(0.5 * width * height / max(count, 1))
+    cell_size = radius / math.sqrt(2)
+    columns, rows = math.ceil(width / cell_size), math.ceil(height / cell_size)
+
+    # every cell holds at most one point, -1 is an empty cell. the grid is padded by 2 cells so the neighbourhoods never leave it
+    grid = np.full((rows + 4, columns + 4), -1, dtype=np.int64)
+    positions = np.empty((rows * columns, 2), dtype=np.float64)
+    point_count = 0
+
+    # a point can only be too close to points in the 5x5 cells around it, so cells 3 apart never conflict
+    # and every cell of one of the 9 phases gets a candidate at the same time
+    row_offsets, column_offsets = np.meshgrid(np.arange(-2, 3), np.arange(-2, 3), indexing="ij")
+    row_offsets, column_offsets = row_offsets.ravel(), column_offsets.ravel()
+
+    for _ in range(attempts):
+        previous_count = point_count
+
+        for phase_row in range(3):
+            for phase_column in range(3):
+                cell_rows, cell_columns = np.nonzero(grid[2 + phase_row:rows + 2:3, 2 + phase_column:columns + 2:3] < 0)
+                cell_rows, cell_columns = cell_rows * 3 + phase_row, cell_columns * 3 + phase_column
+
+                candidates = (np.column_stack([cell_columns, cell_rows]) + rng.random((len(cell_rows), 2))) * cell_size
+
+                valid = (candidates[:, 0] < width) & (candidates[:, 1] < height)
+
+                neighbours = grid[cell_rows[:, None] + 2 + row_offsets, cell_columns[:, None] + 2 + column_offsets]
+                candidate_indices, neighbour_indices = np.nonzero(neighbours >= 0)
+                neighbour_indices = neighbours[candidate_indices, neighbour_indices]
+
+                too_close = ((positions[neighbour_indices] - candidates[candidate_indices]) ** 2).sum(axis=1) < radius ** 2
+                valid[candidate_indices[too_close]] = False
+
+                accepted = np.flatnonzero(valid)
+                positions[point_count:point_count + len(accepted)] = candidates[accepted]
+                grid[cell_rows[accepted] + 2, cell_columns[accepted] + 2] = np.arange(point_count, point_count + len(accepted))
+                point_count += len(accepted)
+
+        # the gaps that are left get rare, once an attempt barely adds points more would not change the look
+        if point_count >= count and point_count - previous_count < point_count * 0.05:
+            break
+
+    # fewer than count only for tiny areas, where not even the first pass fits them
+    keep = rng.choice(point_count, min(count, point_count), replace=False)
+
+    return positions[np.sort(keep)]
+
+def clustered_points(rng, count, width, height, cluster_count=None):
+    cluster_count = cluster_count or max(1, round(math.sqrt(count) / 4))
+
+    centers = rng.random((cluster_count, 2)) * (width, height)
+    spreads = rng.uniform(0.5, 1.5, cluster_count) * min(width, height) / (4 * math.sqrt(cluster_count))
+    clusters = rng.integers(cluster_count, size=count)
+
+    points = centers[clusters] + rng.standard_normal((count, 2)) * spreads[clusters, None]
+
+    # points outside of the area are drawn again from their cluster, clipping would pile them up on the border
+    outside = np.flatnonzero((points < 0).any(axis=1) | (points >= (width, height)).any(axis=1))
+    while len(outside):
+        points[outside] = centers[clusters[outside]] + rng.standard_normal((len(outside), 2)) * spreads[clusters[outside], None]
+        outside = outside[(points[outside] < 0).any(axis=1) | (points[outside] >= (width, height)).any(axis=1)]
+
+    return points
+
+GENERATORS = {
+    "Uniform": uniform_points,
+    "Poisson disc": poisson_disc_points,
+    "Clustered": clustered_points
+}
+
+def generate_points(kind, count, width, height, seed=0):
+    # the same kind, count, area and seed always give the same points
+    return GENERATORS[kind](np.random.default_rng(seed), count, width, height)
+
+def load_points(path):
+    # .npy files are memory mapped, so a big set is only read when its points are copied into a simulator
+    if os.path.splitext(path)[1].lower() == ".npy":
+        points = np.load(path, mmap_mode="r")
+    else:
+        with open(path, "r") as file:
+            first_line = file.readline()
+
+        try:
+            float(first_line.split(",")[0])
+            header_rows = 0
+        except ValueError:
+            header_rows = 1
+
+        points = np.loadtxt(path, delimiter=",", skiprows=header_rows, usecols=(0, 1), ndmin=2)
+
+    if points.ndim != 2 or points.shape[1] < 2:
+        raise ValueError(f"{path} does not hold a list of x, y points")
+
+    return points[:, :2]
+
+def fit_points(points, width, height):
+    # points that leave the area are scaled into it, a set that already fits is kept as it is so saved layouts load back the same
+    points = np.asarray(points, dtype=np.float64)
+    if not len(points) or ((points >= 0).all() and (points[:, 0] < width).all() and (points[:, 1] < height).all()):
+        return points
+
+    low, high = points.min(axis=0), points.max(axis=0)
+    scale = min((width - 1) / max(high[0] - low[0], 1e-9), (height - 1) / max(high[1] - low[1], 1e-9))
+
+    return (points - low) * scale
+
+def save_points(path, points):
+    if os.path.splitext(path)[1].lower() == ".npy":
+        np.save(path, np.asarray(points, dtype=np.float64))
+    else:
+        np.savetxt(path, points, delimiter=",", fmt="%.6f", header="x,y", comments="")
+
+def main():
+    parser = argparse.ArgumentParser(description="Writes a generated point set for the Delaunay and Voronoi simulators to a CSV or NPY file.")
+    parser.add_argument("kind", choices=[kind.lower().replace(" ", "_") for kind in GENERATORS], help="point distribution")
+    parser.add_argument("--count", type=int, default=100000, help="number of points")
+    parser.add_argument("--width", type=float, default=1536, help="width of the area, the simulators use 80%% of the window width")
+    parser.add_argument("--height", type=float, default=1080, help="height of the area")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generator")
+    parser.add_argument("--output", default="points.npy", help=".npy or .csv file to write")
+    args = parser.parse_args()
+
+    kind = next(kind for kind in GENERATORS if kind.lower().replace(" ", "_") == args.kind)
+    points = generate_points(kind, args.count, args.width, args.height, args.seed)
+
+    save_points(args.output, points)
+
+    print(json.dumps({"kind": kind, "count": len(points), "width": args.width, "height": args.height, "seed": args.seed, "output": args.output}, indent=4))
+
+if __name__ == "__main__":
+    main()
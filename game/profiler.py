@@ -0,0 +1,112 @@
+import arcade, numpy as np, time
+
+from collections import deque
+from contextlib import contextmanager
+
+from utils.utils import summarize_timings
+
+class FrameProfiler():
+    def __init__(self, sample_count=240):
+        self.sample_count = sample_count
+        self.samples = {}
+
+        self.last_frame_start = None
+        self.last_refreshes = {}
+
+    def record(self, name, seconds):
+        if name not in self.samples:
+            self.samples[name] = deque(maxlen=self.sample_count)
+
+        self.samples[name].append(seconds)
+
+    @contextmanager
+    def section(self, name):
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def wrap(self, name, function):
+        def timed(*args, **kwargs):
+            with self.section(name):
+                return function(*args, **kwargs)
+
+        return timed
+
+    def refresh_due(self, name, interval=0.2):
+        # rebuilding a text layout is expensive, so labels only refresh a few times per second.
+        # true, and counted as a refresh, when the label called name has not been refreshed for interval seconds
+        current_time = time.perf_counter()
+        if current_time - self.last_refreshes.get(name, 0) < interval:
+            return False
+
+        self.last_refreshes[name] = current_time
+
+        return True
+
+    def mark_frame(self):
+        current_time = time.perf_counter()
+
+        if self.last_frame_start is not None:
+            self.record("Frame", current_time - self.last_frame_start)
+
+        self.last_frame_start = current_time
+
+    def summary(self, name):
+        return summarize_timings(self.samples.get(name, ()))
+
+    def histogram(self, name, bin_count=16, max_ms=50):
+        counts, _ = np.histogram(np.asarray(self.samples.get(name, ())) * 1000, bins=bin_count, range=(0, max_ms))
+        return counts
+
+    def summaries(self):
+        return {name: self.summary(name) for name in self.samples}
+
+class ProfilerOverlay():
+    def __init__(self, profiler, x, y, width=240, height=50):
+        self.profiler = profiler
+
+        self.x, self.y = x, y
+        self.width, self.height = width, height
+
+        self.text = arcade.Text("", x, y + height + 8, arcade.color.WHITE, 11, width=width * 2, multiline=True, anchor_y="bottom", font_name="Roboto")
+
+    def update_text(self):
+        if not self.profiler.refresh_due("Overlay"):
+            return
+
+        # the frame rate comes from the same frame times, it is what the simulators used to show in their own labels
+        lines = [f"FPS: {self.profiler.summary('Frame')['throughput_per_second']:.0f}"]
+
+        for name, summary in self.profiler.summaries().items():
+            lines.append(f"{name}: {summary['mean_ms']:.2f} ms (p50 {summary['p50_ms']:.2f}, p99 {summary['p99_ms']:.2f})")
+
+        self.text.text = "\n".join(lines)
+
+    def draw(self):
+        self.update_text()
+
+        arcade.draw_lrbt_rectangle_filled(self.x - 4, self.x + self.width * 2 + 12, self.y - 4, self.y + self.height + 12 + self.text.content_height, (0, 0, 0, 160))
+        self.text.draw()
+
+        frame_times = np.asarray(self.profiler.samples.get("Frame", ()), dtype=np.float64) * 1000
+        if len(frame_times) < 2:
+            return
+
+        # sparkline of the recent frame times, scaled so 50 ms is the top of the box, with a 60 FPS guide line
+        scale = self.height / 50
+        points = np.column_stack([self.x + np.arange(len(frame_times)) * self.width / self.profiler.sample_count, self.y + np.minimum(frame_times, 50) * scale])
+
+        arcade.draw_line(self.x, self.y + (1000 / 60) * scale, self.x + self.width, self.y + (1000 / 60) * scale, arcade.color.GRAY, 1)
+        arcade.draw_line_strip(points.tolist(), arcade.color.GREEN, 1)
+
+        # histogram of the same window next to it
+        counts = self.profiler.histogram("Frame")
+        bar_width = self.width / len(counts)
+        histogram_x = self.x + self.width + 8
+
+        for n, count in enumerate(counts):
+            if count:
+                arcade.draw_lrbt_rectangle_filled(histogram_x + n * bar_width, histogram_x + (n + 1) * bar_width - 1, self.y, self.y + self.height * count / counts.max(), arcade.color.YELLOW)
@@ -0,0 +1,86 @@
+import numpy as np
+
+from scipy.spatial import cKDTree
+
+class SiteIndex():
+    # a cKDTree can not be changed after it is built, so added and moved sites are kept in a stale set that is searched
+    # directly, and the tree is only rebuilt once that set grows past rebuild_threshold
+    def __init__(self, points=None, rebuild_threshold=64):
+        self.rebuild_threshold = rebuild_threshold
+
+        self.capacity = 64
+        self.points = np.empty((self.capacity, 2), dtype=np.float64)
+        self.count = 0
+
+        self.tree = None
+        self.stale = set()
+
+        if points is not None:
+            self.extend(points)
+
+    def __len__(self):
+        return self.count
+
+    def sites(self):
+        return self.points[:self.count]
+
+    def extend(self, points):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+        if self.count + len(points) > self.capacity:
+            self.capacity = max(self.count + len(points), self.capacity * 2)
+            self.points = np.resize(self.points, (self.capacity, 2))
+
+        self.points[self.count:self.count + len(points)] = points
+        self.stale.update(range(self.count, self.count + len(points)))
+        self.count += len(points)
+
+        if len(self.stale) > self.rebuild_threshold:
+            self.rebuild()
+
+    def add(self, point):
+        self.extend([point])
+
+        return self.count - 1
+
+    def move(self, index, point):
+        self.points[index] = point
+        self.stale.add(index)
+
+        if len(self.stale) > self.rebuild_threshold:
+            self.rebuild()
+
+    def clear(self):
+        self.count = 0
+        self.tree = None
+        self.stale.clear()
+
+    def rebuild(self):
+        self.tree = cKDTree(self.sites(), copy_data=True) if self.count else None
+        self.stale.clear()
+
+    def query(self, point, k=1):
+        # the k closest sites as sorted distances and indices, tree results at an outdated position are skipped and the stale sites compared directly
+        point = np.asarray(point, dtype=np.float64)
+        indices = np.empty(0, dtype=np.int64)
+
+        if self.tree is not None:
+            tree_k = min(k + len(self.stale), self.tree.n)
+            _, tree_indices = self.tree.query(point, k=[i + 1 for i in range(tree_k)])
+            indices = np.array([index for index in np.atleast_1d(tree_indices) if index not in self.stale], dtype=np.int64)
+
+        if self.stale:
+            indices = np.concatenate([indices, np.fromiter(self.stale, dtype=np.int64)])
+
+        distances = np.hypot(*(self.points[indices] - point).T)
+        order = np.argsort(distances, kind="stable")[:k]
+
+        return distances[order], indices[order]
+
+    def pick(self, x, y, radius):
+        distances, indices = self.query((x, y))
+
+        if len(indices) and distances[0] <= radius:
+            return int(indices[0])
+
+        return None
@@ -1,6 +1,8 @@
-import pyglet, arcade, arcade.gui, os, json, numpy as np
+import pyglet, arcade, arcade.gui, ctypes, math, time, os, json, numpy as np
 
-from game.voronoi_diagram_simulator.shader import create_shader
+from game.voronoi_diagram_simulator.shader import create_shader, create_points_buffer, create_candidates_buffer, create_cell_buffers, bind_cell_buffers, clear_cell_buffer, POINT_RADIUS
+from game.voronoi_diagram_simulator.region import site_region
+from game.site_index import SiteIndex
 from game.base import BaseGame
 
 from utils.constants import button_style
@@ -10,16 +12,31 @@ class Game(BaseGame):
     def __init__(self, pypresence_client):
         super().__init__(pypresence_client, "Voronoi Diagram Simulator", "voronoi_diagram_simulator", {
                 "edge_thickness": 0.01,
-                "edge_smoothness": 0.005
+                "edge_smoothness": 0.005,
+                "algorithm": "Jump flooding"
         })
 
+        self.settings["voronoi_diagram_simulator"].setdefault("algorithm", "Jump flooding")
+
         self.points = np.empty((0, 2), dtype=np.float32)
+        self.points_capacity = 128
+        self.site_index = SiteIndex()
         
         self.dragged_point = None
         self.needs_redraw = True
 
+        # while dragging, the diagram still shows the dragged point at patched_position until the next patch
+        self.patched_position = None
+        self.patch_pending = False
+        self.patch_in_flight = False
+        self.last_patch_time = 0
+        self.candidates_capacity = 64
+
     def setup(self):
-        self.shader_program, self.voronoi_image, self.points_sbbo = create_shader(int(self.window.width * 0.8), self.window.height)
+        self.brute_force_program, self.seed_program, self.flood_program, self.render_program, self.patch_program, self.voronoi_image = create_shader(int(self.window.width * 0.8), self.window.height)
+        self.points_ssbo = create_points_buffer(self.points_capacity)
+        self.candidates_ssbo = create_candidates_buffer(self.candidates_capacity)
+        self.cells_ssbos = create_cell_buffers(int(self.window.width * 0.8), self.window.height)
 
         self.image_sprite = pyglet.sprite.Sprite(img=self.voronoi_image)
 
@@ -32,13 +49,170 @@ class Game(BaseGame):
         self.add_point_button = self.settings_box.add(arcade.gui.UITextureButton(text="Add point", texture=button_texture, texture_hovered=button_hovered_texture, width=self.window.width * 0.2, style=button_style))
         self.add_point_button.on_click = lambda event: self.add_point()
 
+        self.add_random_points_button = self.settings_box.add(arcade.gui.UITextureButton(text="Add 1000 random points", texture=button_texture, texture_hovered=button_hovered_texture, width=self.window.width * 0.2, style=button_style))
+        self.add_random_points_button.on_click = lambda event: self.add_random_points(1000)
+
+        self.algorithm_button = self.settings_box.add(arcade.gui.UITextureButton(text=f"Algorithm: {self.settings['voronoi_diagram_simulator']['algorithm']}", texture=button_texture, texture_hovered=button_hovered_texture, width=self.window.width * 0.2, style=button_style))
+        self.algorithm_button.on_click = lambda event: self.switch_algorithm()
+
+        self.add_point_set_settings()
+
+        self.add_gpu_timings_label()
+
         self.setup()
 
     def add_point(self):
         self.points = np.vstack([self.points, [self.window.width * 0.4, self.window.height / 2]]).astype(np.float32)
+        self.site_index.add(self.points[-1])
+
+        self.needs_redraw = True
+
+    def add_random_points(self, count):
+        random_points = np.random.uniform((0, 0), (self.window.width * 0.8, self.window.height), (count, 2))
+        self.points = np.vstack([self.points, random_points]).astype(np.float32)
+        self.site_index.extend(random_points)
+
+        self.needs_redraw = True
+
+    def replace_points(self, points):
+        self.points = np.array(points, dtype=np.float32)
+
+        self.site_index.clear()
+        self.site_index.extend(points)
+
+        # a big set already built its tree while being added
+        if self.site_index.stale:
+            self.site_index.rebuild()
+
+        self.dragged_point = None
+        self.needs_redraw = True
+
+    def switch_algorithm(self):
+        current_settings = self.settings["voronoi_diagram_simulator"]
+
+        current_settings["algorithm"] = "Brute force" if current_settings["algorithm"] == "Jump flooding" else "Jump flooding"
+        self.algorithm_button.text = f"Algorithm: {current_settings['algorithm']}"
 
         self.needs_redraw = True
 
+    def upload_points(self):
+        if len(self.points) > self.points_capacity:
+            self.points_ssbo.delete()
+
+            self.points_capacity = max(len(self.points), self.points_capacity * 2)
+            self.points_ssbo = create_points_buffer(self.points_capacity)
+
+        if len(self.points):
+            self.points_ssbo.set_data_region(self.points.ctypes.data_as(ctypes.c_void_p), 0, self.points.nbytes)
+
+    def brute_force(self, resolution, current_settings, region_offset=(0, 0), region_size=None):
+        region_size = region_size or resolution
+
+        with self.brute_force_program:
+            self.brute_force_program["point_count"] = len(self.points)
+            self.brute_force_program["resolution"] = resolution
+            self.brute_force_program["edge_smoothness"] = current_settings["edge_smoothness"]
+            self.brute_force_program["edge_thickness"] = current_settings["edge_thickness"]
+            self.brute_force_program["region_offset"] = region_offset
+
+            self.brute_force_program.dispatch(math.ceil(region_size[0] / 32), math.ceil(region_size[1] / 32), 1, barrier=pyglet.gl.GL_TEXTURE_FETCH_BARRIER_BIT)
+
+    def render_cells(self, resolution, current_settings, region_offset=(0, 0), region_size=None):
+        region_size = region_size or resolution
+
+        with self.render_program:
+            self.render_program["resolution"] = resolution
+            self.render_program["edge_smoothness"] = current_settings["edge_smoothness"]
+            self.render_program["edge_thickness"] = current_settings["edge_thickness"]
+            self.render_program["region_offset"] = region_offset
+
+            self.render_program.dispatch(math.ceil(region_size[0] / 32), math.ceil(region_size[1] / 32), 1, barrier=pyglet.gl.GL_TEXTURE_FETCH_BARRIER_BIT)
+
+    def jump_flood(self, resolution, current_settings):
+        source_cells_ssbo, target_cells_ssbo = self.cells_ssbos
+
+        clear_cell_buffer(source_cells_ssbo)
+        bind_cell_buffers(source_cells_ssbo, target_cells_ssbo)
+
+        with self.seed_program:
+            self.seed_program["point_count"] = len(self.points)
+            self.seed_program["resolution"] = resolution
+
+            if len(self.points):
+                for seed_pass in range(2):
+                    self.seed_program["seed_pass"] = seed_pass
+                    self.seed_program.dispatch(math.ceil(len(self.points) / 256), 1, 1, barrier=pyglet.gl.GL_SHADER_STORAGE_BARRIER_BIT)
+
+        # halving steps from half the resolution down to 1 pixel, and one more 1 pixel pass that fixes most of the remaining errors
+        step_sizes = [2 ** exponent for exponent in range(math.ceil(math.log2(max(resolution))) - 1, -1, -1)] + [1]
+
+        with self.flood_program:
+            self.flood_program["resolution"] = resolution
+
+            for step_size in step_sizes:
+                self.flood_program["step_size"] = step_size
+                self.flood_program.dispatch(math.ceil(resolution[0] / 32), math.ceil(resolution[1] / 32), 1, barrier=pyglet.gl.GL_SHADER_STORAGE_BARRIER_BIT)
+
+                source_cells_ssbo, target_cells_ssbo = target_cells_ssbo, source_cells_ssbo
+                bind_cell_buffers(source_cells_ssbo, target_cells_ssbo)
+
+        # the flooded cells stay bound at binding 4, where the patches update them
+        self.cells_ssbos = [source_cells_ssbo, target_cells_ssbo]
+
+        self.render_cells(resolution, current_settings)
+
+    def patch_region(self, resolution, current_settings):
+        # the region whose closest two sites can change is bounded by the voronoi cell of the dragged site before and after the move
+        index, new_position = self.dragged_point, self.points[self.dragged_point].copy()
+
+        old_region = site_region(self.site_index, index, self.patched_position)
+        new_region = site_region(self.site_index, index, new_position)
+
+        if old_region is None or new_region is None:
+            return False
+
+        candidates = np.unique(np.concatenate([old_region[0], new_region[0], [index]])).astype(np.int32)
+
+        # the edges reach a bit outside of the cells, and the old and new point circles have to be redrawn too
+        margin = (current_settings["edge_thickness"] + current_settings["edge_smoothness"]) * max(resolution) + POINT_RADIUS + 1
+        corners = np.array([old_region[1], old_region[2], new_region[1], new_region[2], self.patched_position, new_position])
+
+        region_start = np.clip(np.floor(corners.min(axis=0) - margin), 0, resolution).astype(int)
+        region_end = np.clip(np.ceil(corners.max(axis=0) + margin), 0, resolution).astype(int)
+        region_offset, region_size = tuple(region_start), tuple(region_end - region_start)
+
+        if min(region_size) <= 0:
+            return True
+
+        self.points_ssbo.set_data_region(self.points[index:index + 1].ctypes.data_as(ctypes.c_void_p), index * 8, 8)
+
+        if current_settings["algorithm"] == "Jump flooding":
+            if len(candidates) > self.candidates_capacity:
+                self.candidates_ssbo.delete()
+
+                self.candidates_capacity = max(len(candidates), self.candidates_capacity * 2)
+                self.candidates_ssbo = create_candidates_buffer(self.candidates_capacity)
+
+            self.candidates_ssbo.set_data_region(candidates.ctypes.data_as(ctypes.c_void_p), 0, candidates.nbytes)
+
+            with self.patch_program:
+                self.patch_program["resolution"] = resolution
+                self.patch_program["candidate_count"] = len(candidates)
+                self.patch_program["region_offset"] = region_offset
+
+                self.patch_program.dispatch(math.ceil(region_size[0] / 32), math.ceil(region_size[1] / 32), 1, barrier=pyglet.gl.GL_SHADER_STORAGE_BARRIER_BIT)
+
+            self.render_cells(resolution, current_settings, region_offset, region_size)
+        else:
+            self.brute_force(resolution, current_settings, region_offset, region_size)
+
+        self.patched_position = new_position
+
+        return True
+
+    def finish_patch(self, elapsed):
+        self.patch_in_flight = False
+
     def change_value(self, label, text, settings_key, value):
         super().change_value(label, text, settings_key, value)
 
@@ -47,27 +221,57 @@ class Game(BaseGame):
     def on_update(self, delta_time):
         if self.needs_redraw:
             self.needs_redraw = False
+            self.patch_pending = False
+
+            if self.dragged_point is not None:
+                self.patched_position = self.points[self.dragged_point].copy()
 
-            self.points_sbbo.set_data(self.points.tobytes())
+            self.upload_points()
 
-            with self.shader_program:
-                self.shader_program["point_count"] = len(self.points)
-                self.shader_program["resolution"] = (int(self.window.width * 0.8), self.window.height)
-                self.shader_program["edge_smoothness"] = self.settings["voronoi_diagram_simulator"]["edge_smoothness"]
-                self.shader_program["edge_thickness"] = self.settings["voronoi_diagram_simulator"]["edge_thickness"]
+            current_settings = self.settings["voronoi_diagram_simulator"]
+            resolution = (int(self.window.width * 0.8), self.window.height)
 
-                self.shader_program.dispatch(int(int(self.window.width * 0.8) / 32), int(self.window.height / 32))
+            # jump flooding costs about log2(resolution) full screen passes no matter how many sites there are, brute force costs a pass over every site for every pixel
+            if current_settings["algorithm"] == "Jump flooding":
+                with self.gpu_section("Voronoi jump flooding"):
+                    self.jump_flood(resolution, current_settings)
+            else:
+                with self.gpu_section("Voronoi brute force"):
+                    self.brute_force(resolution, current_settings)
+
+        elif self.patch_pending and self.dragged_point is not None:
+            # rate limited: a new patch waits until the GPU finished the last one, moves in between are merged into it.
+            # the timeout keeps dragging alive when the GPU timer has no results
+            current_time = time.perf_counter()
+            if self.patch_in_flight and current_time - self.last_patch_time < 0.25:
+                return
+
+            self.patch_pending = False
+            self.patch_in_flight = True
+            self.last_patch_time = current_time
+
+            current_settings = self.settings["voronoi_diagram_simulator"]
+            resolution = (int(self.window.width * 0.8), self.window.height)
+
+            with self.gpu_section("Voronoi patch", self.finish_patch):
+                patched = self.patch_region(resolution, current_settings)
+
+            # a dragged site on the border of the diagram has an unbounded cell, so it needs a full redraw
+            if not patched:
+                self.needs_redraw = True
 
     def on_mouse_press(self, x, y, button, modifiers):
-        if not self.dragged_point:
-            for i, point in enumerate(self.points.reshape(-1, 2)):
-                if arcade.math.Vec2(x, y).distance(arcade.math.Vec2(*point)) <= 10:
-                    self.dragged_point = i
-                    break
+        if self.dragged_point is None:
+            self.dragged_point = self.site_index.pick(x, y, POINT_RADIUS)
+
+            if self.dragged_point is not None:
+                self.patched_position = self.points[self.dragged_point].copy()
 
     def on_mouse_drag(self, x, y, dx, dy, _buttons, _modifiers):
         if self.dragged_point is not None:
             self.points[self.dragged_point] = [x, y]
+            self.site_index.move(self.dragged_point, (x, y))
+            self.patch_pending = True
 
     def on_mouse_release(self, x, y, button, modifiers):
         self.dragged_point = None
@@ -75,7 +279,16 @@ class Game(BaseGame):
 
     def on_key_press(self, symbol, modifiers):
         if symbol == arcade.key.ESCAPE: # overwrite is needed since shader program needs to be deleted
-            self.shader_program.delete()
+            self.brute_force_program.delete()
+            self.seed_program.delete()
+            self.flood_program.delete()
+            self.render_program.delete()
+            self.patch_program.delete()
+            self.points_ssbo.delete()
+            self.candidates_ssbo.delete()
+
+            for cells_ssbo in self.cells_ssbos:
+                cells_ssbo.delete()
 
             with open("data.json", "w") as file:
                 file.write(json.dumps(self.settings, indent=4))
@@ -86,6 +299,7 @@ class Game(BaseGame):
         elif symbol == arcade.key.C:
             del self.points
             self.points = np.empty((0, 2), dtype=np.float32)
+            self.site_index.clear()
 
             self.needs_redraw = True
 
@@ -94,5 +308,6 @@ class Game(BaseGame):
 
         self.image_sprite.draw()
 
-        for point in self.points.reshape(-1, 2):
-            arcade.draw_circle_filled(point[0], point[1], 10, arcade.color.GRAY)
\ No newline at end of file
+        # the other points are part of the diagram, only the dragged one has to follow the mouse before the next redraw
+        if self.dragged_point is not None:
+            arcade.draw_circle_filled(*self.points[self.dragged_point], POINT_RADIUS, arcade.color.GRAY)
\ No newline at end of file
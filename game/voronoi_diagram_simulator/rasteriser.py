@@ -0,0 +1,70 @@
+import numpy as np, argparse, json, math
+
+from scipy.spatial import cKDTree
+from PIL import Image
+
+from game.point_sets import load_points, fit_points
+from game.site_index import SiteIndex
+from utils.constants import VORONOI_POINT_RADIUS
+
+def hash3(ids):
+    # in float32 like the shader, the sine of a big id would give a different colour in double precision
+    p3 = ids.astype(np.float32)[..., None] * np.array([127.1, 311.7, 74.7], dtype=np.float32)
+    return (np.sin(p3) * np.float32(43758.5453123)) % np.float32(1.0)
+
+def smoothstep(edge0, edge1, x):
+    t = np.clip((x - edge0) / (edge1 - edge0), 0.0, 1.0) if edge1 != edge0 else (x >= edge0).astype(np.float64)
+    return t * t * (3.0 - 2.0 * t)
+
+def rasterise(site_index, width, height, edge_thickness, edge_smoothness, scale=1.0):
+    # the same diagram as the shaders without a GL context. width and height are the size of the diagram the sites live in,
+    # the image has scale times as many pixels in each direction and every pixel samples the diagram at its own position divided by scale.
+    # the shaders measure distances in uv space while the tree of the SiteIndex is in pixels, so the sites of the index
+    # are put into a separate tree scaled to uv space instead of querying the index
+    image_width, image_height = max(1, round(width * scale)), max(1, round(height * scale))
+    image = np.zeros((image_height, image_width, 3), dtype=np.float64)
+
+    sites = site_index.sites()
+    if not len(sites):
+        return image
+
+    resolution = np.array([width, height], dtype=np.float64)
+    tree = cKDTree(sites / resolution)
+
+    pixels = np.stack(np.meshgrid(np.arange(image_width), np.arange(image_height)), axis=-1).reshape(-1, 2) / scale
+    distances, indices = tree.query(pixels / resolution, k=2, workers=-1)
+
+    closest_ids = indices[:, 0]
+
+    edge = 1.0 - smoothstep(edge_thickness - edge_smoothness, edge_thickness + edge_smoothness, distances[:, 1] - distances[:, 0])
+    colors = hash3(closest_ids) * (1.0 - edge)[:, None]
+
+    in_circle = np.hypot(*(pixels - sites[closest_ids]).T) <= VORONOI_POINT_RADIUS
+    colors[in_circle] = 128.0 / 255.0
+
+    image[:] = colors.reshape(image_height, image_width, 3)
+
+    return image
+
+def snapshot(site_index, width, height, edge_thickness, edge_smoothness, scale=1.0):
+    # row 0 of the diagram is the bottom of the view, like the GL texture
+    return Image.fromarray((np.flipud(rasterise(site_index, width, height, edge_thickness, edge_smoothness, scale)) * 255).astype(np.uint8), "RGB")
+
+def main():
+    parser = argparse.ArgumentParser(description="Renders the Voronoi diagram of a CSV or NPY point set to a PNG on the CPU, the same way the simulator draws it.")
+    parser.add_argument("points", help=".npy or .csv file with the sites, written by game.point_sets for example")
+    parser.add_argument("--width", type=float, default=1536, help="width of the diagram area, the simulator uses 80%% of the window width")
+    parser.add_argument("--height", type=float, default=1080, help="height of the diagram area")
+    parser.add_argument("--scale", type=float, default=1.0, help="pixels of the image per pixel of the diagram")
+    parser.add_argument("--edge-thickness", type=float, default=0.01, help="edge thickness in uv space")
+    parser.add_argument("--edge-smoothness", type=float, default=0.005, help="edge smoothness in uv space")
+    parser.add_argument("--output", default="voronoi.png", help="PNG file to write")
+    args = parser.parse_args()
+
+    site_index = SiteIndex(fit_points(load_points(args.points), args.width, args.height))
+    snapshot(site_index, math.ceil(args.width), math.ceil(args.height), args.edge_thickness, args.edge_smoothness, args.scale).save(args.output)
+
+    print(json.dumps({"points": args.points, "sites": len(site_index), "width": args.width, "height": args.height, "scale": args.scale, "output": args.output}, indent=4))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import numpy as np
+
+from scipy.spatial import Delaunay, QhullError
+
+# the delaunay neighbours of a site are practically always among its closest sites, so only those are triangulated
+NEIGHBOURHOOD_SIZE = 48
+
+def circumcenters(triangles):
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    b, c = b - a, c - a
+
+    d = 2 * (b[:, 0] * c[:, 1] - b[:, 1] * c[:, 0])
+    b_length, c_length = (b ** 2).sum(1), (c ** 2).sum(1)
+
+    return a + np.column_stack([c[:, 1] * b_length - b[:, 1] * c_length, b[:, 0] * c_length - c[:, 0] * b_length]) / d[:, None]
+
+def site_region(site_index, index, position):
+    # the closest sites to the site at index if it was at position, and the bounding box of its voronoi cell.
+    # the closest sites are returned instead of only the delaunay neighbours, the second closest site of a pixel in the cell is often a neighbour of a neighbour
+    # None when the cell is unbounded or can not be triangulated, then the whole diagram has to be redrawn
+    _, nearest = site_index.query(position, NEIGHBOURHOOD_SIZE + 1)
+    nearest = nearest[nearest != index][:NEIGHBOURHOOD_SIZE]
+
+    if len(nearest) < 3:
+        return None
+
+    local_points = np.vstack([[position], site_index.points[nearest]])
+
+    try:
+        triangulation = Delaunay(local_points)
+    except QhullError:
+        return None
+
+    simplices = triangulation.simplices[(triangulation.simplices == 0).any(axis=1)]
+
+    # a site on the hull of its neighbourhood may have a cell that reaches the border of the diagram
+    if not len(simplices) or (triangulation.convex_hull == 0).any():
+        return None
+
+    cell_corners = circumcenters(local_points[simplices])
+
+    return nearest, cell_corners.min(axis=0), cell_corners.max(axis=0)
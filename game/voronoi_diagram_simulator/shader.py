@@ -1,37 +1,89 @@
 import pyglet, pyglet.graphics
 
-from pyglet.gl import GL_NEAREST, glBindBufferBase, GL_SHADER_STORAGE_BUFFER
+from pyglet.gl import GL_NEAREST, glBindBufferBase, glBindBuffer, glClearBufferData, GL_SHADER_STORAGE_BUFFER
 
-shader_source = """#version 430 core
+from utils.constants import VORONOI_POINT_RADIUS as POINT_RADIUS
 
-layout (std430, binding = 3) buffer Points {
+common_source = f"""#version 430 core
+
+layout (std430, binding = 3) readonly buffer Points {{
     vec2 points[];
-};
+}};
 
-uniform int point_count;
 uniform vec2 resolution;
+
+vec3 hash3(float p) {{
+    vec3 p3 = vec3(p * 127.1, p * 311.7, p * 74.7);
+    return fract(sin(p3) * 43758.5453123);
+}}
+
+// distances are measured in uv space, like the brute force diagram always did
+float site_distance(int site, vec2 texel) {{
+    return length((texel - points[site]) / resolution);
+}}
+
+// keeps the closest and second closest of the sites passed in so far
+void consider_site(int site, vec2 texel, inout int closest_id, inout int second_id, inout float min_dist, inout float second_min) {{
+    if (site < 0 || site == closest_id || site == second_id) {{
+        return;
+    }}
+
+    float dist = site_distance(site, texel);
+
+    if (dist < min_dist) {{
+        second_id = closest_id;
+        second_min = min_dist;
+        closest_id = site;
+        min_dist = dist;
+    }}
+    else if (dist < second_min) {{
+        second_id = site;
+        second_min = dist;
+    }}
+}}
+
+// the points are drawn into the diagram, drawing tens of thousands of circles on the CPU every frame is too slow
+vec4 shade(ivec2 texel_coord, int closest_id, float min_dist, float second_min, float edge_thickness, float edge_smoothness) {{
+    if (closest_id < 0) {{
+        return vec4(0.0, 0.0, 0.0, 1.0);
+    }}
+
+    if (distance(vec2(texel_coord), points[closest_id]) <= {POINT_RADIUS}.0) {{
+        return vec4(vec3(128.0 / 255.0), 1.0);
+    }}
+
+    float edge_dist = second_min - min_dist;
+    float edge = 1.0 - smoothstep(edge_thickness - edge_smoothness, edge_thickness + edge_smoothness, edge_dist);
+
+    vec3 cell_color = hash3(float(closest_id));
+    vec3 color = mix(cell_color, vec3(0.0), edge);
+
+    return vec4(color, 1.0);
+}}
+"""
+
+brute_force_source = common_source + """
+uniform int point_count;
 uniform float edge_thickness;
 uniform float edge_smoothness;
+uniform ivec2 region_offset;
 
 layout (local_size_x = 32, local_size_y = 32, local_size_z = 1) in;
 layout (location = 0, rgba32f) uniform image2D img_output;
 
-vec3 hash3(float p) {
-    vec3 p3 = vec3(p * 127.1, p * 311.7, p * 74.7);
-    return fract(sin(p3) * 43758.5453123);
-}
-
 void main() {
-    ivec2 texel_coord = ivec2(gl_GlobalInvocationID.xy);
-    vec2 uv = vec2(texel_coord) / resolution;
+    ivec2 texel_coord = ivec2(gl_GlobalInvocationID.xy) + region_offset;
+
+    if (texel_coord.x >= int(resolution.x) || texel_coord.y >= int(resolution.y)) {
+        return;
+    }
 
     float min_dist = 1e5;
     float second_min = 1e5;
-    int closest_id = 0;
+    int closest_id = -1;
 
     for (int i = 0; i < point_count; i++) {
-        vec2 point = points[i] / resolution;
-        float dist = length(uv - point);
+        float dist = site_distance(i, vec2(texel_coord));
 
         if (dist < min_dist) {
             second_min = min_dist;
@@ -43,25 +95,201 @@ void main() {
         }
     }
 
-    float edge_dist = second_min - min_dist;
-    float edge = 1.0 - smoothstep(edge_thickness - edge_smoothness, edge_thickness + edge_smoothness, edge_dist);
+    imageStore(img_output, texel_coord, shade(texel_coord, closest_id, min_dist, second_min, edge_thickness, edge_smoothness));
+}
+"""
 
-    vec3 cell_color = hash3(float(closest_id));
-    vec3 color = mix(cell_color, vec3(0.0), edge);
+# every cell holds the closest and second closest site found so far, -1 is no site.
+# sites sharing a texel are resolved in two passes: the first keeps the smallest distance to the texel in cells.y,
+# the second lets only the sites at that distance write their index, like the flood pass would pick the closest one.
+# the distance is quantised and offset so it is always below the -1 of an empty cell, the flood pass ignores it as a site
+seed_source = common_source + """
+layout (std430, binding = 4) buffer Cells {
+    ivec2 cells[];
+};
+
+uniform int point_count;
+uniform int seed_pass;
+
+layout (local_size_x = 256, local_size_y = 1, local_size_z = 1) in;
+
+void main() {
+    int site = int(gl_GlobalInvocationID.x);
+
+    if (site >= point_count) {
+        return;
+    }
+
+    // a site outside of the image, dragged past its edge for example, still owns pixels in the brute force diagram,
+    // so it is seeded into the closest edge texel and floods in from there
+    ivec2 texel_coord = clamp(ivec2(floor(points[site])), ivec2(0), ivec2(resolution) - 1);
+
+    int index = texel_coord.y * int(resolution.x) + texel_coord.x;
+
+    // inside of its texel a site is less than 2 texels of the shorter side away in uv space, so 24 bits of fraction fit into an int
+    int packed_dist = int(site_distance(site, vec2(texel_coord)) * min(resolution.x, resolution.y) * 16777216.0) - 2147483647;
+
+    if (seed_pass == 0) {
+        atomicMin(cells[index].y, packed_dist);
+    }
+    else if (cells[index].y == packed_dist) {
+        // sites at exactly the same distance resolve to the highest index, whatever order the invocations run in
+        atomicMax(cells[index].x, site);
+    }
+}
+"""
+
+flood_source = common_source + """
+layout (std430, binding = 4) readonly buffer SourceCells {
+    ivec2 source_cells[];
+};
+
+layout (std430, binding = 5) writeonly buffer TargetCells {
+    ivec2 target_cells[];
+};
+
+uniform int step_size;
+
+layout (local_size_x = 32, local_size_y = 32, local_size_z = 1) in;
 
-    imageStore(img_output, texel_coord, vec4(color, 1.0));
+void main() {
+    ivec2 texel_coord = ivec2(gl_GlobalInvocationID.xy);
+    ivec2 size = ivec2(resolution);
+
+    if (texel_coord.x >= size.x || texel_coord.y >= size.y) {
+        return;
+    }
+
+    int closest_id = -1;
+    int second_id = -1;
+    float min_dist = 1e5;
+    float second_min = 1e5;
+
+    // both sites of the 3x3 neighbours step_size apart are candidates, so the second closest site floods along with the closest one
+    for (int y = -1; y <= 1; y++) {
+        for (int x = -1; x <= 1; x++) {
+            ivec2 neighbour = texel_coord + ivec2(x, y) * step_size;
+
+            if (neighbour.x < 0 || neighbour.y < 0 || neighbour.x >= size.x || neighbour.y >= size.y) {
+                continue;
+            }
+
+            ivec2 cell = source_cells[neighbour.y * size.x + neighbour.x];
+
+            consider_site(cell.x, vec2(texel_coord), closest_id, second_id, min_dist, second_min);
+            consider_site(cell.y, vec2(texel_coord), closest_id, second_id, min_dist, second_min);
+        }
+    }
+
+    target_cells[texel_coord.y * size.x + texel_coord.x] = ivec2(closest_id, second_id);
+}
+"""
+
+render_source = common_source + """
+layout (std430, binding = 4) readonly buffer Cells {
+    ivec2 cells[];
+};
+
+uniform float edge_thickness;
+uniform float edge_smoothness;
+uniform ivec2 region_offset;
+
+layout (local_size_x = 32, local_size_y = 32, local_size_z = 1) in;
+layout (location = 0, rgba32f) uniform image2D img_output;
+
+void main() {
+    ivec2 texel_coord = ivec2(gl_GlobalInvocationID.xy) + region_offset;
+
+    if (texel_coord.x >= int(resolution.x) || texel_coord.y >= int(resolution.y)) {
+        return;
+    }
+
+    ivec2 cell = cells[texel_coord.y * int(resolution.x) + texel_coord.x];
+
+    float min_dist = cell.x < 0 ? 1e5 : site_distance(cell.x, vec2(texel_coord));
+    float second_min = cell.y < 0 ? 1e5 : site_distance(cell.y, vec2(texel_coord));
+
+    imageStore(img_output, texel_coord, shade(texel_coord, cell.x, min_dist, second_min, edge_thickness, edge_smoothness));
+}
+"""
+
+# when a single site moved, the closest two sites of a pixel are among its previous two, the moved site and the sites around
+# the moved site before and after the move, so only the affected region is patched in place instead of flooding again
+patch_source = common_source + """
+layout (std430, binding = 4) buffer Cells {
+    ivec2 cells[];
+};
+
+layout (std430, binding = 6) readonly buffer Candidates {
+    int candidates[];
+};
+
+uniform int candidate_count;
+uniform ivec2 region_offset;
+
+layout (local_size_x = 32, local_size_y = 32, local_size_z = 1) in;
+
+void main() {
+    ivec2 texel_coord = ivec2(gl_GlobalInvocationID.xy) + region_offset;
+
+    if (texel_coord.x >= int(resolution.x) || texel_coord.y >= int(resolution.y)) {
+        return;
+    }
+
+    int index = texel_coord.y * int(resolution.x) + texel_coord.x;
+    ivec2 cell = cells[index];
+
+    int closest_id = -1;
+    int second_id = -1;
+    float min_dist = 1e5;
+    float second_min = 1e5;
+
+    consider_site(cell.x, vec2(texel_coord), closest_id, second_id, min_dist, second_min);
+    consider_site(cell.y, vec2(texel_coord), closest_id, second_id, min_dist, second_min);
+
+    for (int i = 0; i < candidate_count; i++) {
+        consider_site(candidates[i], vec2(texel_coord), closest_id, second_id, min_dist, second_min);
+    }
+
+    cells[index] = ivec2(closest_id, second_id);
 }
 """
 
 def create_shader(width, height):
-    shader_program = pyglet.graphics.shader.ComputeShaderProgram(shader_source)
+    brute_force_program = pyglet.graphics.shader.ComputeShaderProgram(brute_force_source)
+    seed_program = pyglet.graphics.shader.ComputeShaderProgram(seed_source)
+    flood_program = pyglet.graphics.shader.ComputeShaderProgram(flood_source)
+    render_program = pyglet.graphics.shader.ComputeShaderProgram(render_source)
+    patch_program = pyglet.graphics.shader.ComputeShaderProgram(patch_source)
 
     voronoi_diagram_image = pyglet.image.Texture.create(width, height, internalformat=pyglet.gl.GL_RGBA32F, min_filter=GL_NEAREST, mag_filter=GL_NEAREST)
 
-    uniform_location = shader_program["img_output"]
+    # both programs that write the diagram declare it at location 0
+    uniform_location = brute_force_program["img_output"]
     voronoi_diagram_image.bind_image_texture(unit=uniform_location)
 
-    points_ssbo = pyglet.graphics.BufferObject(128 * 8)
+    return brute_force_program, seed_program, flood_program, render_program, patch_program, voronoi_diagram_image
+
+def create_points_buffer(capacity):
+    # the points array is runtime sized, the buffer is reallocated bigger when the points outgrow it
+    points_ssbo = pyglet.graphics.BufferObject(capacity * 8, usage=pyglet.gl.GL_DYNAMIC_DRAW)
     glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 3, points_ssbo.id)
 
-    return shader_program, voronoi_diagram_image, points_ssbo
\ No newline at end of file
+    return points_ssbo
+
+def create_candidates_buffer(capacity):
+    candidates_ssbo = pyglet.graphics.BufferObject(capacity * 4, usage=pyglet.gl.GL_STREAM_DRAW)
+    glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 6, candidates_ssbo.id)
+
+    return candidates_ssbo
+
+def create_cell_buffers(width, height):
+    return [pyglet.graphics.BufferObject(width * height * 8, usage=pyglet.gl.GL_DYNAMIC_COPY) for _ in range(2)]
+
+def bind_cell_buffers(source_cells_ssbo, target_cells_ssbo):
+    glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 4, source_cells_ssbo.id)
+    glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 5, target_cells_ssbo.id)
+
+def clear_cell_buffer(cells_ssbo):
+    glBindBuffer(GL_SHADER_STORAGE_BUFFER, cells_ssbo.id)
+    glClearBufferData(GL_SHADER_STORAGE_BUFFER, pyglet.gl.GL_RG32I, pyglet.gl.GL_RG_INTEGER, pyglet.gl.GL_INT, (pyglet.gl.GLint * 2)(-1, -1))
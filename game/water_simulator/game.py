@@ -1,8 +1,10 @@
-import arcade, arcade.gui, pyglet.gl, array, random, os, json
+import arcade, arcade.gui, pyglet.gl, numpy as np, logging, ctypes, math, os, json
 
-from utils.constants import WATER_ROWS, WATER_COLS
+from utils.constants import WATER_GRID_SIZE, MAX_WATER_GRID_SIZE, button_style
+from utils.preload import button_texture, button_hovered_texture
 
-from game.water_simulator.shader import create_shader
+from game.water_simulator.shader import create_shader, create_grid, create_splash_buffer, bind_height_buffers, read_heights, TILE_SIZE, SPLASH_TILE_SIZE
+from game.water_simulator.solver import WaterSolver, resample_heights
 from game.base import BaseGame
 
 class Game(BaseGame):
@@ -11,18 +13,31 @@ class Game(BaseGame):
                 "splash_strength": 0.1,
                 "splash_radius": 3,
                 "wave_speed": 1,
-                "damping": 0.02
+                "damping": 0.02,
+                "substeps": 1,
+                "grid_size": WATER_GRID_SIZE,
+                "backend": "GPU"
         })
+
+        self.settings["water_simulator"].setdefault("substeps", 1)
+        self.settings["water_simulator"].setdefault("grid_size", WATER_GRID_SIZE)
+        self.settings["water_simulator"].setdefault("backend", "GPU")
+
+        # the GPU backend needs compute shaders (GL 4.3), everything else falls back to the NumPy solver
+        self.compute_supported = self.window.ctx.gl_version >= (4, 3)
+        self.backend = self.settings["water_simulator"]["backend"] if self.compute_supported else "CPU"
+
+        if not self.compute_supported:
+            logging.warning("Compute shaders are not supported, using the CPU water solver.")
+
+        self.rows = self.cols = int(self.settings["water_simulator"]["grid_size"])
         
-        self.splash_row = 0
-        self.splash_col = 0
-        self.current_splash_strength = 0
-        
-        self.splash_strength = self.settings["water_simulator"].get("splash_strength", 0.1)
-        self.splash_radius = self.settings["water_simulator"].get("splash_radius", 3)
-        
-        self.wave_speed = self.settings["water_simulator"].get("wave_speed", 1)
-        self.damping = self.settings["water_simulator"].get("damping", 0.02)
+        self.splash_queue = []
+        self.splash_capacity = 256
+        self.last_drag_cell = None
+
+        self.shader_program = None
+        self.solver = None
 
     def on_show_view(self):
         super().on_show_view()
@@ -38,27 +53,105 @@ class Game(BaseGame):
 
         self.add_setting("Wave Speed: {value}", 0.1, 1.25, 0.05, "wave_speed")
         self.add_setting("Damping: {value}", 0.005, 0.05, 0.001, "damping")
+        self.add_setting("Substeps per frame: {value}", 1, 16, 1, "substeps")
+        self.add_setting("Grid Size: {value}", 32, MAX_WATER_GRID_SIZE, 32, "grid_size")
+
+        self.backend_button = self.settings_box.add(arcade.gui.UITextureButton(text=f"Backend: {self.backend}", texture=button_texture, texture_hovered=button_hovered_texture, width=self.window.width * 0.2, style=button_style))
+        self.backend_button.on_click = lambda event: self.switch_backend()
+
+        self.add_gpu_timings_label()
         self.setup_game()
 
+    def add_splash(self, row, col, strength=None, radius=None):
+        # queued instead of applied right away, so any number of splashes between two updates is kept
+        if strength is None:
+            strength = self.settings["water_simulator"]["splash_strength"]
+        if radius is None:
+            radius = self.settings["water_simulator"]["splash_radius"]
+
+        self.splash_queue.append((row, col, strength, radius))
+
+    def apply_splashes(self):
+        splashes = np.array(self.splash_queue, dtype=np.float32)
+        self.splash_queue.clear()
+
+        if len(splashes) > self.splash_capacity:
+            self.splashes_ssbo.delete()
+
+            self.splash_capacity = max(len(splashes), self.splash_capacity * 2)
+            self.splashes_ssbo = create_splash_buffer(self.splash_capacity)
+
+        self.splashes_ssbo.set_data_region(splashes.ctypes.data_as(ctypes.c_void_p), 0, splashes.nbytes)
+
+        with self.splash_program:
+            self.splash_program["rows"] = self.rows
+            self.splash_program["cols"] = self.cols
+
+            # one small dispatch per splash over its bounding box, overlapping splashes are ordered by the barrier
+            for index, radius in enumerate(splashes[:, 3]):
+                group_count = math.ceil((math.ceil(radius) * 2 + 1) / SPLASH_TILE_SIZE)
+
+                self.splash_program["splash_index"] = index
+                self.splash_program.dispatch(group_count, group_count, 1, barrier=pyglet.gl.GL_SHADER_STORAGE_BARRIER_BIT)
+
     def on_update(self, delta_time):
+        # resizing here instead of in change_value means dragging the slider only reallocates once per frame
+        grid_size = int(self.settings["water_simulator"]["grid_size"])
+        if grid_size != self.rows or grid_size != self.cols:
+            self.resize_grid(grid_size, grid_size)
+
+        current_settings = self.settings["water_simulator"]
+
+        if self.backend == "CPU":
+            with self.profile_section("Water CPU step"):
+                for splash in self.splash_queue:
+                    self.solver.add_splash(*splash)
+
+                self.splash_queue.clear()
+                self.solver.step(current_settings["wave_speed"], current_settings["damping"], int(current_settings["substeps"]))
+
+            return
+
+        if self.splash_queue:
+            with self.gpu_section("Water splashes"):
+                self.apply_splashes()
+
         with self.shader_program:
-            self.shader_program["rows"] = WATER_ROWS
-            self.shader_program["cols"] = WATER_COLS
-            
-            self.shader_program["splash_row"] = self.splash_row
-            self.shader_program["splash_col"] = self.splash_col
-            self.shader_program["splash_strength"] = self.current_splash_strength
-            self.shader_program["splash_radius"] = self.splash_radius
+            self.shader_program["rows"] = self.rows
+            self.shader_program["cols"] = self.cols
 
-            self.shader_program["wave_speed"] = self.wave_speed
-            self.shader_program["damping"] = self.damping
-            
-            self.shader_program.dispatch(self.water_image.width, self.water_image.height, 1, barrier=pyglet.gl.GL_ALL_BARRIER_BITS)
+            self.shader_program["wave_speed"] = current_settings["wave_speed"]
+            self.shader_program["damping"] = current_settings["damping"]
+
+            with self.gpu_section("Water step"):
+                for _ in range(int(current_settings["substeps"])):
+                    # the step is written over the previous heights, so swapping the buffers makes it the current one
+                    self.shader_program.dispatch(math.ceil(self.cols / TILE_SIZE), math.ceil(self.rows / TILE_SIZE), 1, barrier=pyglet.gl.GL_SHADER_STORAGE_BARRIER_BIT)
+
+                    self.previous_heights_ssbo, self.current_heights_ssbo = self.current_heights_ssbo, self.previous_heights_ssbo
+                    bind_height_buffers(self.previous_heights_ssbo, self.current_heights_ssbo)
 
-        self.current_splash_strength = 0
+            pyglet.gl.glMemoryBarrier(pyglet.gl.GL_SHADER_IMAGE_ACCESS_BARRIER_BIT | pyglet.gl.GL_TEXTURE_FETCH_BARRIER_BIT)
 
     def setup_game(self):
-        self.shader_program, self.water_image, self.previous_heights_ssbo, self.current_heights_ssbo = create_shader() 
+        if self.compute_supported:
+            self.shader_program, self.splash_program = create_shader()
+            self.splashes_ssbo = create_splash_buffer(self.splash_capacity)
+
+        self.create_grid(np.random.uniform(-0.1, 0.1, (self.rows, self.cols)).astype(np.float32))
+
+    def create_grid(self, heights, previous_heights=None):
+        if previous_heights is None:
+            previous_heights = heights
+
+        if self.backend == "GPU":
+            self.water_image, self.previous_heights_ssbo, self.current_heights_ssbo = create_grid(self.shader_program, self.rows, self.cols)
+
+            self.previous_heights_ssbo.set_data(previous_heights.tobytes())
+            self.current_heights_ssbo.set_data(heights.tobytes())
+        else:
+            self.water_image = pyglet.image.Texture.create(self.cols, self.rows, internalformat=pyglet.gl.GL_RGBA8, min_filter=pyglet.gl.GL_NEAREST, mag_filter=pyglet.gl.GL_NEAREST)
+            self.solver = WaterSolver(heights, previous_heights)
 
         self.image_sprite = pyglet.sprite.Sprite(img=self.water_image)
 
@@ -68,16 +161,53 @@ class Game(BaseGame):
         self.image_sprite.scale_x = scale_x
         self.image_sprite.scale_y = scale_y
 
-        grid = array.array('f', [random.uniform(-0.1, 0.1) for _ in range(WATER_ROWS * WATER_COLS)])
+    def get_heights(self):
+        if self.backend == "GPU":
+            return read_heights(self.current_heights_ssbo, self.rows, self.cols), read_heights(self.previous_heights_ssbo, self.rows, self.cols)
 
-        self.previous_heights_ssbo.set_data(grid.tobytes())
-        self.current_heights_ssbo.set_data(grid.tobytes())
+        return self.solver.current_heights, self.solver.previous_heights
 
-    def on_key_press(self, symbol, modifiers):
-        if symbol == arcade.key.ESCAPE: # overwrite to remove shader program and SSBOs
-            self.shader_program.delete()
+    def delete_grid(self):
+        self.image_sprite.delete()
+        self.water_image.delete()
+
+        if self.backend == "GPU":
             self.previous_heights_ssbo.delete()
             self.current_heights_ssbo.delete()
+        else:
+            self.solver = None
+
+    def resize_grid(self, rows, cols):
+        current_heights, previous_heights = self.get_heights()
+
+        self.delete_grid()
+
+        self.rows, self.cols = rows, cols
+        self.create_grid(resample_heights(current_heights, rows, cols), resample_heights(previous_heights, rows, cols))
+
+    def switch_backend(self):
+        if not self.compute_supported:
+            return
+
+        # the simulation continues from the same heights on the other backend
+        current_heights, previous_heights = self.get_heights()
+
+        self.delete_grid()
+
+        self.backend = "CPU" if self.backend == "GPU" else "GPU"
+        self.settings["water_simulator"]["backend"] = self.backend
+        self.backend_button.text = f"Backend: {self.backend}"
+
+        self.create_grid(current_heights, previous_heights)
+
+    def on_key_press(self, symbol, modifiers):
+        if symbol == arcade.key.ESCAPE: # overwrite to remove shader program and SSBOs
+            if self.shader_program is not None:
+                self.shader_program.delete()
+                self.splash_program.delete()
+                self.splashes_ssbo.delete()
+
+            self.delete_grid()
 
             with open("data.json", "w") as file:
                 file.write(json.dumps(self.settings, indent=4))
@@ -85,15 +215,41 @@ class Game(BaseGame):
             from menus.main import Main
             self.window.show_view(Main(self.pypresence_client))
 
-    def on_mouse_press(self, x, y, button, modifiers):        
-        col = int(x / (self.window.width * 0.8) * WATER_COLS)
-        row = int(y / self.window.height * WATER_ROWS)
+    def mouse_to_cell(self, x, y):
+        return int(y / self.window.height * self.rows), int(x / (self.window.width * 0.8) * self.cols)
+
+    def on_mouse_press(self, x, y, button, modifiers):
+        self.last_drag_cell = self.mouse_to_cell(x, y)
+        self.add_splash(*self.last_drag_cell)
+
+    def on_mouse_drag(self, x, y, dx, dy, _buttons, _modifiers):
+        if self.last_drag_cell is None:
+            return
 
-        self.splash_row = row
-        self.splash_col = col
-        self.current_splash_strength = self.splash_strength
+        # a trail of splashes about one radius apart, so fast drags do not leave gaps between two mouse events
+        row, col = self.mouse_to_cell(x, y)
+        last_row, last_col = self.last_drag_cell
+
+        spacing = max(self.settings["water_simulator"]["splash_radius"], 1)
+        count = int(math.hypot(row - last_row, col - last_col) / spacing)
+
+        for n in range(1, count + 1):
+            self.add_splash(round(last_row + (row - last_row) * n / count), round(last_col + (col - last_col) * n / count))
+
+        if count:
+            self.last_drag_cell = row, col
+
+    def on_mouse_release(self, x, y, button, modifiers):
+        self.last_drag_cell = None
 
     def on_draw(self):
         super().on_draw()
 
+        # the CPU heights only become a texture when a frame is actually drawn
+        if self.backend == "CPU" and self.solver.dirty:
+            self.solver.dirty = False
+
+            pyglet.gl.glBindTexture(self.water_image.target, self.water_image.id)
+            pyglet.gl.glTexSubImage2D(self.water_image.target, 0, 0, 0, self.cols, self.rows, pyglet.gl.GL_RGBA, pyglet.gl.GL_UNSIGNED_BYTE, self.solver.image_data().ctypes.data_as(ctypes.c_void_p))
+
         self.image_sprite.draw()
\ No newline at end of file
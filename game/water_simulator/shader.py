@@ -1,80 +1,157 @@
-import pyglet, pyglet.graphics
+import pyglet, pyglet.graphics, ctypes, numpy as np
 
-from pyglet.gl import glBindBufferBase, GL_SHADER_STORAGE_BUFFER, GL_NEAREST
+from pyglet.gl import glBindBufferBase, glBindBuffer, glGetBufferSubData, GL_SHADER_STORAGE_BUFFER, GL_NEAREST
 
-from utils.constants import WATER_ROWS, WATER_COLS
+TILE_SIZE = 16
+SPLASH_TILE_SIZE = 8
 
 shader_source = f"""#version 430 core
 
+// previous_heights is read and then overwritten by the same invocation with the next step,
+// current_heights is only read, so no invocation depends on the scheduling of another one
 layout(std430, binding = 3) buffer PreviousHeights {{
-    float previous_heights[{WATER_ROWS * WATER_COLS}]; 
+    float previous_heights[];
 }};
 
-layout(std430, binding = 4) buffer CurrentHeights {{
-    float current_heights[{WATER_ROWS * WATER_COLS}];
+layout(std430, binding = 4) readonly buffer CurrentHeights {{
+    float current_heights[];
 }};
 
 uniform int rows;
 uniform int cols;
-uniform int splash_row;
-uniform int splash_col;
 uniform float damping;
 uniform float wave_speed;
-uniform float splash_strength;
-uniform float splash_radius;
 
-layout (local_size_x = 1, local_size_y = 1, local_size_z = 1) in;
+layout (local_size_x = {TILE_SIZE}, local_size_y = {TILE_SIZE}, local_size_z = 1) in;
 layout (location = 0, rgba32f) uniform image2D img_output;
 
+// the tile plus a one cell halo on every side, corners are never read by the 5 point stencil
+shared float tile[{TILE_SIZE + 2}][{TILE_SIZE + 2}];
+
+float load_height(int row, int col) {{
+    if (row < 0 || col < 0 || row >= rows || col >= cols) return 0.0;
+
+    return current_heights[row * cols + col];
+}}
+
 void main() {{
-    ivec2 texel_coord = ivec2(gl_GlobalInvocationID.xy);
+    int col = int(gl_GlobalInvocationID.x);
+    int row = int(gl_GlobalInvocationID.y);
+
+    int local_col = int(gl_LocalInvocationID.x) + 1;
+    int local_row = int(gl_LocalInvocationID.y) + 1;
+
+    tile[local_row][local_col] = load_height(row, col);
+
+    if (gl_LocalInvocationID.x == 0) tile[local_row][0] = load_height(row, col - 1);
+    if (gl_LocalInvocationID.x == {TILE_SIZE - 1}) tile[local_row][{TILE_SIZE + 1}] = load_height(row, col + 1);
+    if (gl_LocalInvocationID.y == 0) tile[0][local_col] = load_height(row - 1, col);
+    if (gl_LocalInvocationID.y == {TILE_SIZE - 1}) tile[{TILE_SIZE + 1}][local_col] = load_height(row + 1, col);
+
+    // every invocation has to reach the barrier, so out of range and border cells only return after it
+    barrier();
+
+    if (row >= rows || col >= cols) return;
 
-    int row = texel_coord.y * rows / imageSize(img_output).y;
-    int col = texel_coord.x * cols / imageSize(img_output).x;
     int current_index = (row * cols) + col;
+    float current_height = tile[local_row][local_col];
 
-    if(row == 0 || col == 0 || row == rows-1 || col == cols-1) return;
+    // border cells never move, copying them keeps both buffers equal there after the swap
+    if (row == 0 || col == 0 || row == rows - 1 || col == cols - 1) {{
+        previous_heights[current_index] = current_height;
+        return;
+    }}
 
-    float dist = distance(vec2(row, col), vec2(splash_row, splash_col));
-    if(dist <= splash_radius) current_heights[current_index] += splash_strength * (1.0 - dist / splash_radius);
-        
-    float laplacian = current_heights[(row - 1) * cols + col] + 
-                      current_heights[(row + 1) * cols + col] +
-                      current_heights[row * cols + (col - 1)] +
-                      current_heights[row * cols + (col + 1)] - 
-                      4.0 * current_heights[current_index];
+    float laplacian = tile[local_row - 1][local_col] +
+                      tile[local_row + 1][local_col] +
+                      tile[local_row][local_col - 1] +
+                      tile[local_row][local_col + 1] -
+                      4.0 * current_height;
 
     float dt = 0.1;
 
-    float h_new = 2.0 * current_heights[current_index]
+    float h_new = 2.0 * current_height
                   - previous_heights[current_index] +
                   (wave_speed * wave_speed)*(dt*dt) * laplacian -
-                  damping * (current_heights[current_index] - previous_heights[current_index]);
+                  damping * (current_height - previous_heights[current_index]);
+
+    previous_heights[current_index] = h_new;
 
-    previous_heights[current_index] = current_heights[current_index];
-    current_heights[current_index] = h_new;
-    
     float minH = -0.5;
     float maxH = 0.5;
     float normH = clamp((h_new - minH) / (maxH - minH), 0.0, 1.0);
 
-    imageStore(img_output, texel_coord, vec4(0.0, 0.0, normH, 1.0));
+    imageStore(img_output, ivec2(col, row), vec4(0.0, 0.0, normH, 1.0));
 }}
 
 """
 
+splash_shader_source = f"""#version 430 core
+
+layout(std430, binding = 4) buffer CurrentHeights {{
+    float current_heights[];
+}};
+
+// row, column, strength and radius of every splash queued this frame
+layout(std430, binding = 5) readonly buffer Splashes {{
+    vec4 splashes[];
+}};
+
+uniform int rows;
+uniform int cols;
+uniform int splash_index;
+
+layout (local_size_x = {SPLASH_TILE_SIZE}, local_size_y = {SPLASH_TILE_SIZE}, local_size_z = 1) in;
+
+void main() {{
+    vec4 splash = splashes[splash_index];
+    int reach = int(ceil(splash.w));
+
+    // only the bounding box of the splash is dispatched, starting at its bottom left cell
+    int row = int(splash.x) - reach + int(gl_GlobalInvocationID.y);
+    int col = int(splash.y) - reach + int(gl_GlobalInvocationID.x);
+
+    if (row <= 0 || col <= 0 || row >= rows - 1 || col >= cols - 1) return;
+
+    float dist = distance(vec2(row, col), splash.xy);
+    if (dist <= splash.w) current_heights[row * cols + col] += splash.z * (1.0 - dist / splash.w);
+}}
+"""
+
+def bind_height_buffers(previous_heights_ssbo, current_heights_ssbo):
+    glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 3, previous_heights_ssbo.id)
+    glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 4, current_heights_ssbo.id)
+
 def create_shader():
     shader_program = pyglet.graphics.shader.ComputeShaderProgram(shader_source)
+    splash_program = pyglet.graphics.shader.ComputeShaderProgram(splash_shader_source)
+
+    return shader_program, splash_program
+
+def create_splash_buffer(capacity):
+    splashes_ssbo = pyglet.graphics.BufferObject(capacity * 16, usage=pyglet.gl.GL_STREAM_DRAW)
+    glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 5, splashes_ssbo.id)
 
-    water_image = pyglet.image.Texture.create(WATER_COLS, WATER_ROWS, internalformat=pyglet.gl.GL_RGBA32F, min_filter=GL_NEAREST, mag_filter=GL_NEAREST)
+    return splashes_ssbo
+
+def create_grid(shader_program, rows, cols):
+    water_image = pyglet.image.Texture.create(cols, rows, internalformat=pyglet.gl.GL_RGBA32F, min_filter=GL_NEAREST, mag_filter=GL_NEAREST)
 
     uniform_location = shader_program['img_output']
     water_image.bind_image_texture(unit=uniform_location)
 
-    previous_heights_ssbo = pyglet.graphics.BufferObject(WATER_COLS * WATER_ROWS * 4, usage=pyglet.gl.GL_DYNAMIC_COPY)
-    current_heights_ssbo = pyglet.graphics.BufferObject(WATER_COLS * WATER_ROWS * 4, usage=pyglet.gl.GL_DYNAMIC_COPY)
-    
-    glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 3, previous_heights_ssbo.id)
-    glBindBufferBase(GL_SHADER_STORAGE_BUFFER, 4, current_heights_ssbo.id)
+    # the arrays in the shaders are runtime sized, so the buffers alone decide the grid size
+    previous_heights_ssbo = pyglet.graphics.BufferObject(cols * rows * 4, usage=pyglet.gl.GL_DYNAMIC_COPY)
+    current_heights_ssbo = pyglet.graphics.BufferObject(cols * rows * 4, usage=pyglet.gl.GL_DYNAMIC_COPY)
+
+    bind_height_buffers(previous_heights_ssbo, current_heights_ssbo)
+
+    return water_image, previous_heights_ssbo, current_heights_ssbo
+
+def read_heights(heights_ssbo, rows, cols):
+    heights = np.empty((rows, cols), dtype=np.float32)
+
+    glBindBuffer(GL_SHADER_STORAGE_BUFFER, heights_ssbo.id)
+    glGetBufferSubData(GL_SHADER_STORAGE_BUFFER, 0, heights.nbytes, heights.ctypes.data_as(ctypes.c_void_p))
 
-    return shader_program, water_image, previous_heights_ssbo, current_heights_ssbo
\ No newline at end of file
+    return heights
@@ -0,0 +1,69 @@
+import numpy as np
+
+from scipy.ndimage import map_coordinates
+
+def resample_heights(heights, rows, cols):
+    # bilinear sampling at the new cell centres, so a wave keeps its place and shape on the new grid
+    old_rows, old_cols = heights.shape
+
+    row_coords = (np.arange(rows) + 0.5) * old_rows / rows - 0.5
+    col_coords = (np.arange(cols) + 0.5) * old_cols / cols - 0.5
+
+    return map_coordinates(heights, np.meshgrid(row_coords, col_coords, indexing="ij"), order=1, mode="nearest").astype(np.float32)
+
+class WaterSolver():
+    # the same wave equation, splash and border rules as the compute shaders in shader.py
+    def __init__(self, current_heights, previous_heights=None):
+        self.current_heights = np.array(current_heights, dtype=np.float32)
+        self.previous_heights = self.current_heights.copy() if previous_heights is None else np.array(previous_heights, dtype=np.float32)
+
+        self.rows, self.cols = self.current_heights.shape
+        self.dirty = True
+
+    def add_splash(self, row, col, strength, radius):
+        # only the bounding box of the splash is touched, border cells never move
+        reach = int(np.ceil(radius))
+        row, col = int(row), int(col)
+
+        row_start, row_end = max(row - reach, 1), min(row + reach + 1, self.rows - 1)
+        col_start, col_end = max(col - reach, 1), min(col + reach + 1, self.cols - 1)
+
+        if row_start >= row_end or col_start >= col_end:
+            return
+
+        rows, cols = np.ogrid[row_start:row_end, col_start:col_end]
+        distance = np.hypot(rows - row, cols - col).astype(np.float32)
+
+        self.current_heights[row_start:row_end, col_start:col_end] += np.where(distance <= radius, strength * (1 - distance / radius), 0).astype(np.float32)
+        self.dirty = True
+
+    def step(self, wave_speed, damping, substeps=1):
+        speed_factor = np.float32(wave_speed * wave_speed * 0.1 * 0.1)
+        damping = np.float32(damping)
+
+        for _ in range(substeps):
+            current, previous = self.current_heights, self.previous_heights
+            center = current[1:-1, 1:-1]
+
+            laplacian = current[:-2, 1:-1] + current[2:, 1:-1] + current[1:-1, :-2] + current[1:-1, 2:] - 4 * center
+
+            # the step overwrites the previous heights and the buffers swap, like the ping-pong SSBOs
+            previous[1:-1, 1:-1] = 2 * center - previous[1:-1, 1:-1] + speed_factor * laplacian - damping * (center - previous[1:-1, 1:-1])
+
+            previous[[0, -1], :] = current[[0, -1], :]
+            previous[:, [0, -1]] = current[:, [0, -1]]
+
+            self.current_heights, self.previous_heights = previous, current
+
+        self.dirty = True
+
+    def image_data(self):
+        # RGBA8 in the same colours as the shader, the shader never writes the border texels so they stay black here
+        image = np.zeros((self.rows, self.cols, 4), dtype=np.uint8)
+
+        image[..., 2] = np.clip(self.current_heights + 0.5, 0, 1) * 255
+        image[..., 3] = 255
+        image[[0, -1], :, 2] = 0
+        image[:, [0, -1], 2] = 0
+
+        return image
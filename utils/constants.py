@@ -6,8 +6,10 @@ from arcade.gui.widgets.slider import UISliderStyle
 SMALL_RADIUS = 75
 LARGE_RADIUS = 150
 
-WATER_ROWS = 128
-WATER_COLS = 128
+WATER_GRID_SIZE = 128
+MAX_WATER_GRID_SIZE = 2048
+
+VORONOI_POINT_RADIUS = 10
 
 menu_background_color = (30, 30, 47)
 log_dir = 'logs'
@@ -42,6 +44,7 @@ settings = {
     },
     "Miscellaneous": {
         "Discord RPC": {"type": "bool", "config_key": "discord_rpc", "default": True},
+        "Performance Overlay": {"type": "bool", "config_key": "performance_overlay", "default": True},
     },
     "Credits": {}
 }
@@ -1,4 +1,4 @@
-import logging, arcade, arcade.gui, sys, traceback
+import logging, arcade, arcade.gui, sys, traceback, numpy as np
 
 from utils.constants import menu_background_color
 
@@ -88,3 +88,14 @@ class FakePyPresence():
         ...
     def close(self, *args, **kwargs):
         ...
+
+def summarize_timings(timings):
+    timings_ms = np.asarray(timings, dtype=np.float64) * 1000
+    mean = float(timings_ms.mean()) if len(timings_ms) else 0.0
+
+    return {
+        "mean_ms": round(mean, 4),
+        "p50_ms": round(float(np.percentile(timings_ms, 50)), 4) if len(timings_ms) else 0.0,
+        "p99_ms": round(float(np.percentile(timings_ms, 99)), 4) if len(timings_ms) else 0.0,
+        "throughput_per_second": round(1000 / mean, 2) if mean else 0.0
+    }